@@ -0,0 +1,52 @@
+from typing import Annotated, Any
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Query, status
+from sqlalchemy import ARRAY, Select, any_, bindparam
+from sqlalchemy import UUID as SA_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_BATCH_IDS = 100
+
+
+def batch_ids(
+    ids: list[str] = Query(
+        ...,
+        description=f"Up to {MAX_BATCH_IDS} ids, repeated (`ids=a&ids=b`) or comma separated",
+    ),
+) -> list[UUID]:
+    """The requested ids in request order, without duplicates."""
+    try:
+        parsed = [UUID(part) for value in ids for part in value.split(",") if part]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid id"
+        )
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed or len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Between 1 and {MAX_BATCH_IDS} ids are required",
+        )
+    return parsed
+
+
+BatchIdsDep = Annotated[list[UUID], Depends(batch_ids)]
+
+
+async def fetch_batch(
+    session: AsyncSession, query: Select, model: Any, ids: list[UUID]
+) -> dict:
+    """Load the rows of `query` whose `model.id` is in `ids` with one query.
+
+    Items keep the order of `ids`; ids without a row are listed in `missing`.
+    """
+    # `= ANY(:ids)` binds a single array, so every batch size shares one
+    # prepared statement, unlike an IN list with one parameter per id
+    ids_param = bindparam("ids", ids, type_=ARRAY(SA_UUID(as_uuid=True)))
+    rows = await session.scalars(query.where(model.id == any_(ids_param)))
+    by_id = {row.id: row for row in rows.unique()}
+    return {
+        "items": [by_id[id] for id in ids if id in by_id],
+        "missing": [id for id in ids if id not in by_id],
+    }
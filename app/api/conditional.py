@@ -0,0 +1,63 @@
+"""HTTP conditional request helpers (ETag / Last-Modified / 304)."""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# Responses may be cached but must be revalidated, and only by the client
+CACHE_CONTROL = "private, no-cache"
+# For content that never changes under its URL, such as content-addressed files
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def make_etag(*parts: object) -> str:
+    """Weak ETag derived from the given version parts."""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """Whether `If-None-Match` / `If-Modified-Since` allow answering 304.
+
+    As in RFC 9110, `If-Modified-Since` is ignored when `If-None-Match` is sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, so W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have one second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: datetime | None = None
+) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
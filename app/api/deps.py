@@ -1,46 +1,84 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator
+from uuid import UUID
 from app import models
-from app.core.db import SessionLocal
+from app.core.db import AsyncSessionLocal
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, Security, status
+from app.core.cache import user_cache
+from app.core.query_stats import current_query_stats
 from app.core.security import decode_access_token
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 
-# Dependency to get DB session (synchronous)
+# Dependency to get DB session (asynchronous)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-SessionDep = Annotated[Session, Depends(get_db)]
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
 
 # OAuth2 scheme for retrieving token from the authorization header
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_current_user(token: str = Security(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def get_current_user(token: str = Security(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> models.User:
     try:
         payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail="Invalid authentication credentials")
+        user_id = UUID(user_id)
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Could not validate credentials")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await _get_user_cached(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"User not found")
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+    return user
+
+
+async def _get_user_cached(db: AsyncSession, user_id: UUID) -> models.User | None:
+    """Load a user through `user_cache`, only querying the database on a miss.
+
+    The cache holds plain column values; on a hit they are attached to `db` as
+    a persistent instance without emitting SQL, so routes can still modify
+    and commit the returned user as usual.
+    """
+    key = str(user_id)
+    values = user_cache.get(key)
+    if values is not None:
+        user = models.User(**values)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
+    if user:
+        user_cache.set(key, {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(models.User).column_attrs
+        })
     return user
 
 
+def invalidate_cached_user(user_id: UUID) -> None:
+    """Drop a user from `user_cache`, call after changing or deactivating them.
+
+    Only clears this worker's cache, the others see the change once their
+    entry expires after `USER_CACHE_TTL` seconds.
+    """
+    user_cache.invalidate(str(user_id))
+
+
 CurrentUser = Annotated[models.User, Depends(get_current_user)]
 
 
@@ -49,3 +87,18 @@ def get_current_active_superuser(current_user: CurrentUser) -> models.User:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="The user doesn't have enough privileges")
     return current_user
+
+
+def query_budget(max_queries: int):
+    """Route dependency declaring how many SQL statements the route may run.
+
+    Exceeding it is logged, or fails the request when `DB_QUERY_BUDGET_STRICT`
+    is set. Usage: `dependencies=[Depends(query_budget(4))]`.
+    """
+
+    async def set_budget() -> None:
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return set_budget
@@ -1,9 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, FastAPI
 
-from app.api.routes import auth, users, rooms, study_material
+from app.api.routes import auth, users, rooms, study_material, monitoring, storage
 
-api_router = APIRouter()
-api_router.include_router(users.router, prefix="/users")
-api_router.include_router(auth.router, prefix="/auth")
-api_router.include_router(rooms.router, prefix="/rooms")
-api_router.include_router(study_material.router, prefix="/rooms")
\ No newline at end of file
+# Included into the app one by one rather than through a combined router:
+# each `include_router` rebuilds every route it copies, and building the
+# routes was most of the app's startup time after imports
+api_routers: list[tuple[APIRouter, str]] = [
+    (users.router, "/users"),
+    (auth.router, "/auth"),
+    (rooms.router, "/rooms"),
+    (study_material.router, "/rooms"),
+    (monitoring.router, "/monitoring"),
+    (storage.router, "/storage"),
+]
+
+
+def include_api_routers(app: FastAPI, prefix: str) -> None:
+    for router, router_prefix in api_routers:
+        app.include_router(router, prefix=prefix + router_prefix)
@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Query, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass
+class CursorParams:
+    cursor: str | None = Query(
+        None, description="`next_cursor` from the previous page")
+    size: int = Query(50, ge=1, le=100, description="Page size")
+
+
+CursorParamsDep = Annotated[CursorParams, Depends()]
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+async def cursor_paginate(
+    session: AsyncSession, query: Select, model: Any, params: CursorParams
+) -> dict:
+    """Keyset-paginate `query` over `model`'s `(created_at, id)`, newest first.
+
+    Unlike `LimitOffsetPage` this never counts rows or skips over earlier
+    pages: each page is a range scan on a `(..., created_at, id)` index
+    starting right after the cursor.
+    """
+    if params.cursor:
+        created_at, id = decode_cursor(params.cursor)
+        query = query.where(
+            tuple_(model.created_at, model.id) < tuple_(created_at, id))
+    query = query.order_by(
+        model.created_at.desc(), model.id.desc()).limit(params.size + 1)
+
+    items = list((await session.scalars(query)).unique())
+    next_cursor = None
+    if len(items) > params.size:
+        items = items[: params.size]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": items, "size": params.size, "next_cursor": next_cursor}
+
+
+async def apaginate(session: AsyncSession, query: Select, **kwargs: Any) -> Any:
+    """`fastapi_pagination.ext.sqlalchemy.apaginate`, imported on first use.
+
+    The extension (and the SQLAlchemy and pagination internals it loads) is
+    one of the slowest imports of the app, and a fresh worker rarely serves
+    a limit/offset listing first.
+    """
+    from fastapi_pagination.ext.sqlalchemy import apaginate
+
+    return await apaginate(session, query, **kwargs)
@@ -0,0 +1,21 @@
+"""JSON responses rendered straight from pydantic models."""
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    """JSON response written by the model's pydantic-core serializer.
+
+    A model returned from a route is validated again against the route's
+    `response_model`, dumped to Python dicts and encoded with `json.dumps`.
+    Returning it wrapped in a `ModelResponse` skips all three: the compiled
+    serializer writes the JSON bytes in one pass. Nothing checks the model
+    against `response_model` then, so only wrap instances of that exact
+    type, such as the pages built by `apaginate`.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
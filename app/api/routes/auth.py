@@ -3,14 +3,15 @@ from datetime import timedelta, datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.config import settings
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    PasswordHasherBusy,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
 )
 from app.api.deps import SessionDep
 from app import models, schemas
 from app.schemas.token import Token
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
 
@@ -18,38 +19,53 @@ from sqlalchemy.exc import IntegrityError
 router = APIRouter(tags=["auth"])
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def create_user(user_in: schemas.user.UserCreate, session: SessionDep) -> schemas.user.UserBase:
+async def create_user(user_in: schemas.user.UserCreate, session: SessionDep) -> schemas.user.UserBase:
+    try:
+        hashed_password = await get_password_hash_async(user_in.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     new_user = models.User(
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         **user_in.dict(exclude={"password"}),
     )
     session.add(new_user)
 
     try:
-        session.commit()
-        session.refresh(new_user)
+        await session.commit()
+        await session.refresh(new_user)
         return new_user
     except IntegrityError:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="User with this email already exists")
 
 
 @router.post("/login", response_model=Token)
-def login(session: SessionDep, form_data: OAuth2PasswordRequestForm = Depends()) -> Token:
+async def login(session: SessionDep, form_data: OAuth2PasswordRequestForm = Depends()) -> Token:
     """Simple login endpoint that returns a JWT access token.
 
     - **email**: User's email address (used as username)
     - **password**: User's password"""
-    user = session.query(models.User).filter(
-        models.User.email == form_data.username).first()
+    user = await session.scalar(select(models.User).where(
+        models.User.email == form_data.username))
     if not user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Incorrect email or password")
 
-    verified, new_hash = verify_password(
-        form_data.password, user.hashed_password)
+    try:
+        verified, new_hash = await verify_password_async(
+            form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not verified:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Incorrect email or password")
@@ -59,7 +75,7 @@ def login(session: SessionDep, form_data: OAuth2PasswordRequestForm = Depends())
 
     user.last_login = datetime.now(timezone.utc)
     session.add(user)
-    session.commit()
+    await session.commit()
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -0,0 +1,32 @@
+import os
+from fastapi import APIRouter, Depends
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core import jobs
+from app.core.cache import user_cache
+from app.core.db import get_pool_stats
+from app.schemas import monitoring as monitoring_schemas
+
+router = APIRouter(
+    tags=["monitoring"], dependencies=[Depends(get_current_active_superuser)]
+)
+
+
+@router.get("/db-pool", summary="Database connection pool statistics")
+async def db_pool_stats() -> monitoring_schemas.PoolStats:
+    """Checked-out, idle and overflow connections plus checkout wait times.
+
+    Statistics are per worker process, so with several gunicorn workers each
+    call reports on whichever worker handled it (see `pid`)."""
+    return get_pool_stats()
+
+
+@router.get("/user-cache", summary="Authenticated user cache statistics")
+async def user_cache_stats() -> monitoring_schemas.CacheStats:
+    """Size and hit/miss counters of the authenticated user cache in this worker."""
+    return {"pid": os.getpid(), **user_cache.stats()}
+
+
+@router.get("/jobs", summary="Background job queue statistics")
+async def job_queue_stats(session: SessionDep) -> monitoring_schemas.JobQueueStats:
+    """Jobs per status, age of the oldest due job and recent queue wait and run times."""
+    return await jobs.queue_stats(session)
@@ -1,17 +1,28 @@
 from fastapi.params import Query
-from sqlalchemy.orm import joinedload
-from fastapi import APIRouter, HTTPException, Response, status
+from sqlalchemy.orm import contains_eager, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi_pagination import LimitOffsetPage
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import func, or_
-from app.api.deps import CurrentUser, SessionDep
+from sqlalchemy import exists, func, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+from app.api.batch import BatchIdsDep, fetch_batch
+from app.api.conditional import is_not_modified, make_etag, not_modified, set_validators
+from app.api.deps import CurrentUser, SessionDep, query_budget
+from app.api.pagination import CursorParamsDep, apaginate, cursor_paginate
+from app.api.responses import ModelResponse
+from app.core import jobs
 from app.schemas import room as room_schemas, study_material as study_material_schemas
-from app.models import room as room_models, study_material as study_material_models
+from app.schemas.batch import Batch
+from app.schemas.pagination import CursorPage
+from app.models import room as room_models, study_material as study_material_models, user as user_models
+from app.worker.tasks import RELEASE_BLOBS
 from typing import Literal
-from uuid import UUID
+from uuid import UUID, uuid4
 
 router = APIRouter(tags=["study_rooms"])
 
+# SQLSTATE raised by PostgreSQL for a unique constraint violation
+UNIQUE_VIOLATION = "23505"
+
 
 @router.post(
     "/", summary="Create a new study room", status_code=status.HTTP_201_CREATED
@@ -32,25 +43,92 @@ async def create_study_room(
     room.members.append(room_models.StudyRoomMember(user_id=current_user.id))
 
     session.add(room)
-    session.commit()
-    session.refresh(room)
+    await session.commit()
+    await session.refresh(
+        room, ["created_at", "updated_at", "member_count", "creator"])
     return room
 
 
-@router.get("/{room_id}", summary="Get details of a study room")
+@router.get(
+    "/cursor",
+    summary="List study rooms with cursor pagination",
+    response_model=CursorPage[room_schemas.StudyRoomBase],
+    dependencies=[Depends(query_budget(2))],
+)
+async def list_study_rooms_cursor(
+    session: SessionDep,
+    current_user: CurrentUser,
+    params: CursorParamsDep,
+    filter_by: Literal["all", "created", "joined"] = Query("all"),
+) -> ModelResponse:
+    """List study rooms newest first, using an opaque `next_cursor` instead of offsets.
+
+    Pages cost the same however deep they are, but there is no total count. Use
+    the offset listing for search results or when a total is needed."""
+    query = _rooms_query(current_user, filter_by)
+    page = await cursor_paginate(session, query, room_models.StudyRoom, params)
+    return ModelResponse(CursorPage[room_schemas.StudyRoomBase].model_validate(page))
+
+
+@router.get(
+    "/batch",
+    summary="Get several study rooms",
+    response_model=Batch[room_schemas.StudyRoomBase],
+    dependencies=[Depends(query_budget(1))],
+)
+async def get_study_rooms_batch(
+    ids: BatchIdsDep, session: SessionDep
+) -> Batch[room_schemas.StudyRoomBase]:
+    """Retrieve several study rooms with their creators in one request, in the order of `ids`.
+
+    Unknown ids are listed in `missing`."""
+    query = select(room_models.StudyRoom).options(
+        joinedload(room_models.StudyRoom.creator)
+    )
+    return await fetch_batch(session, query, room_models.StudyRoom, ids)
+
+
+@router.get(
+    "/{room_id}",
+    summary="Get details of a study room",
+    dependencies=[Depends(query_budget(2))],
+)
 async def get_study_room(
-    room_id: UUID, session: SessionDep
+    room_id: UUID, session: SessionDep, request: Request, response: Response
 ) -> room_schemas.StudyRoomBase:
-    """Retrieve details of a study room by its ID."""
-    room = (
-        session.query(room_models.StudyRoom)
-        .filter(room_models.StudyRoom.id == room_id)
-        .first()
+    """Retrieve details of a study room by its ID.
+
+    Supports `If-None-Match` / `If-Modified-Since`, answering 304 when neither
+    the room nor its creator has changed."""
+    # Cheap version lookup first, so unchanged rooms skip the full load. The
+    # creator is part of the response, so their version counts too.
+    versions = (
+        await session.execute(
+            select(room_models.StudyRoom.updated_at, user_models.User.updated_at)
+            .join(room_models.StudyRoom.creator)
+            .where(room_models.StudyRoom.id == room_id)
+        )
+    ).first()
+    if versions is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
+        )
+    room_updated_at, creator_updated_at = versions
+    updated_at = max(room_updated_at, creator_updated_at)
+    etag = make_etag(room_id, room_updated_at.isoformat(), creator_updated_at.isoformat())
+    if is_not_modified(request, etag, updated_at):
+        return not_modified(etag, updated_at)
+
+    room = await session.scalar(
+        select(room_models.StudyRoom)
+        .options(joinedload(room_models.StudyRoom.creator))
+        .where(room_models.StudyRoom.id == room_id)
     )
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
         )
+    set_validators(response, etag, updated_at)
     return room
 
 
@@ -58,44 +136,96 @@ async def get_study_room(
     "/",
     summary="List all study rooms",
     response_model=LimitOffsetPage[room_schemas.StudyRoomBase],
+    dependencies=[Depends(query_budget(3))],
 )
 async def list_study_rooms(
     session: SessionDep,
     current_user: CurrentUser,
     search: str | None = Query(None, min_length=1),
+    search_mode: Literal["auto", "fulltext", "trigram"] = Query("auto"),
     filter_by: Literal["all", "created", "joined"] = Query("all"),
-) -> LimitOffsetPage[room_schemas.StudyRoomBase]:
-    """List all available study rooms."""
-    query = session.query(room_models.StudyRoom)
+) -> ModelResponse:
+    """List all available study rooms.
+
+    With `search`, rooms are ranked by relevance:
+
+    - **fulltext**: word matches on name and description, names weigh more
+    - **trigram**: substring matches ranked by trigram similarity, for short or partial terms
+    - **auto**: both of the above, so partial words still match"""
+    query = _rooms_query(current_user, filter_by)
+
+    if search:
+        query = _apply_room_search(query, search, search_mode)
+    else:
+        query = query.order_by(
+            room_models.StudyRoom.created_at.desc(), room_models.StudyRoom.id.desc()
+        )
+    return ModelResponse(await apaginate(session, query))
+
+
+def _rooms_query(current_user, filter_by: str):
+    """Base query for room listings, without ordering."""
+    query = select(room_models.StudyRoom).options(
+        joinedload(room_models.StudyRoom.creator)
+    )
 
     if filter_by == "created":
-        query = query.filter(
+        query = query.where(
             room_models.StudyRoom.created_by == current_user.id)
     elif filter_by == "joined":
-        query = query.join(room_models.StudyRoomMember).filter(
+        query = query.join(room_models.StudyRoomMember).where(
             room_models.StudyRoomMember.user_id == current_user.id
         )
+    return query
 
-    if search:
-        query = query.filter(
-            or_(
-                room_models.StudyRoom.name.ilike(f"%{search}%"),
-                room_models.StudyRoom.description.ilike(f"%{search}%"),
-            )
-        )
-    query = query.order_by(room_models.StudyRoom.created_at.desc())
-    return paginate(session, query)
 
+def _apply_room_search(query, search: str, search_mode: str):
+    """Filter and rank `query` by `search`, using the GIN search indexes on study_rooms."""
+    room = room_models.StudyRoom
+    ts_query = func.websearch_to_tsquery("english", search)
+    fulltext_match = room.search_vector.op("@@")(ts_query)
+    fulltext_rank = func.ts_rank_cd(room.search_vector, ts_query)
 
-@router.delete("/{room_id}", summary="Delete a study room")
+    # ILIKE '%term%' is served by the gin_trgm_ops indexes
+    pattern = f"%{_escape_like(search)}%"
+    trigram_match = or_(
+        room.name.ilike(pattern, escape="\\"),
+        room.description.ilike(pattern, escape="\\"),
+    )
+    trigram_rank = func.greatest(
+        func.similarity(room.name, search),
+        func.similarity(func.coalesce(room.description, ""), search),
+    )
+
+    if search_mode == "fulltext":
+        query = query.where(fulltext_match)
+        rank = fulltext_rank
+    elif search_mode == "trigram":
+        query = query.where(trigram_match)
+        rank = trigram_rank
+    else:
+        query = query.where(or_(fulltext_match, trigram_match))
+        rank = fulltext_rank + trigram_rank
+
+    return query.order_by(rank.desc(), room.created_at.desc(), room.id.desc())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.delete(
+    "/{room_id}",
+    summary="Delete a study room",
+    dependencies=[Depends(query_budget(5))],
+)
 async def delete_study_room(
     room_id: UUID, current_user: CurrentUser, session: SessionDep
 ):
     """Delete a study room by its ID. Only the owner of the room can delete it."""
-    room = (
-        session.query(room_models.StudyRoom)
-        .filter(room_models.StudyRoom.id == room_id)
-        .first()
+    room = await session.scalar(
+        select(room_models.StudyRoom).where(
+            room_models.StudyRoom.id == room_id)
     )
     if not room:
         raise HTTPException(
@@ -106,57 +236,96 @@ async def delete_study_room(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the owner can delete this study room",
         )
-    session.delete(room)
-    session.commit()
+    # Materials go with the room through ON DELETE CASCADE, remember which
+    # blobs they used so unreferenced files can be removed once committed.
+    blob_sha256s = await session.scalars(
+        select(study_material_models.StudyMaterial.blob_sha256)
+        .where(
+            study_material_models.StudyMaterial.room_id == room_id,
+            study_material_models.StudyMaterial.blob_sha256.is_not(None),
+        )
+        .distinct()
+    )
+    blob_sha256s = blob_sha256s.all()
+    await session.delete(room)
+    if blob_sha256s:
+        jobs.enqueue(session, RELEASE_BLOBS, {"sha256s": blob_sha256s})
+    await session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.post("/{room_id}/join", summary="Join a study room")
+@router.post(
+    "/{room_id}/join",
+    summary="Join a study room",
+    dependencies=[Depends(query_budget(3))],
+)
 async def join_study_room(
     room_id: UUID, current_user: CurrentUser, session: SessionDep
 ):
     """Join a study room by its ID. The user will be added to the members list of the room."""
 
-    # with for update to prevent race conditions when multiple users try to join the same room at the same time
-    room = (
-        session.query(room_models.StudyRoom)
-        .filter(room_models.StudyRoom.id == room_id)
-        .with_for_update()
-        .first()
-    )
-
-    if not room:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
+    # A single INSERT ... SELECT that only produces a row while the room has
+    # capacity. FOR UPDATE makes concurrent joins re-check member_count (kept
+    # by the members trigger) after the previous join commits, and duplicates
+    # are rejected by the uix_study_room_user constraint. Joins to the same
+    # room still queue on its row, as the trigger updates it anyway; the lock
+    # is only held for this one statement and the commit.
+    room_with_capacity = (
+        select(
+            literal(uuid4(), room_models.StudyRoomMember.id.type),
+            room_models.StudyRoom.id,
+            literal(current_user.id, room_models.StudyRoomMember.user_id.type),
         )
-
-    member_count = (
-        session.query(func.count(room_models.StudyRoomMember.id))
-        .filter(room_models.StudyRoomMember.study_room_id == room_id)
-        .scalar()
-    )
-
-    if member_count >= room.max_members:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Study room is full"
+        .where(
+            room_models.StudyRoom.id == room_id,
+            room_models.StudyRoom.member_count < room_models.StudyRoom.max_members,
         )
-
-    existing_member = (
-        session.query(room_models.StudyRoomMember)
-        .filter_by(study_room_id=room_id, user_id=current_user.id)
-        .first()
+        .with_for_update()
+    )
+    statement = (
+        insert(room_models.StudyRoomMember)
+        .from_select(["id", "study_room_id", "user_id"], room_with_capacity)
+        .returning(room_models.StudyRoomMember.id)
     )
-    if existing_member:
+    try:
+        joined = (await session.execute(statement)).first() is not None
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if getattr(e.orig, "sqlstate", None) != UNIQUE_VIOLATION:
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are already a member of this study room",
         )
 
-    new_member = room_models.StudyRoomMember(user_id=current_user.id)
-
-    room.members.append(new_member)
-    session.add(new_member)
-    session.commit()
+    if not joined:
+        # Nothing was inserted, only now pay for finding out why. A full room
+        # inserts nothing before the unique constraint is checked, so members
+        # are told apart here.
+        room_exists, is_member = (
+            await session.execute(
+                select(
+                    exists().where(room_models.StudyRoom.id == room_id),
+                    exists().where(
+                        room_models.StudyRoomMember.study_room_id == room_id,
+                        room_models.StudyRoomMember.user_id == current_user.id,
+                    ),
+                )
+            )
+        ).one()
+        if not room_exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
+            )
+        if is_member:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You are already a member of this study room",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Study room is full"
+        )
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -165,19 +334,18 @@ async def leave_study_room(
     room_id: UUID, current_user: CurrentUser, session: SessionDep
 ):
     """Leave a study room by its ID. The user will be removed from the members list of the room."""
-    room = (
-        session.query(room_models.StudyRoom)
-        .filter(room_models.StudyRoom.id == room_id)
-        .first()
+    room = await session.scalar(
+        select(room_models.StudyRoom).where(
+            room_models.StudyRoom.id == room_id)
     )
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
         )
-    member = (
-        session.query(room_models.StudyRoomMember)
-        .filter_by(study_room_id=room_id, user_id=current_user.id)
-        .first()
+    member = await session.scalar(
+        select(room_models.StudyRoomMember).filter_by(
+            study_room_id=room_id, user_id=current_user.id
+        )
     )
     if not member:
         raise HTTPException(
@@ -189,8 +357,8 @@ async def leave_study_room(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Owner cannot leave their own study room. Consider deleting the room instead.",
         )
-    session.delete(member)
-    session.commit()
+    await session.delete(member)
+    await session.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -198,36 +366,98 @@ async def leave_study_room(
     "/{room_id}/reports",
     summary="List reports for a study room",
     response_model=LimitOffsetPage[study_material_schemas.StudyMaterialReportResponse],
+    dependencies=[Depends(query_budget(4))],
 )
 async def list_room_reports(
     current_user: CurrentUser, session: SessionDep, room_id: UUID
-) -> LimitOffsetPage[study_material_schemas.StudyMaterialReportResponse]:
+) -> ModelResponse:
     """List all reports for a specific study room, Only room owners can view reports for their rooms."""
+    query = await _room_reports_query(session, current_user, room_id)
+    query = query.order_by(
+        study_material_models.StudyMaterialReport.created_at.desc(),
+        study_material_models.StudyMaterialReport.id.desc(),
+    )
+    return ModelResponse(await apaginate(session, query))
+
 
-    room = (
-        session.query(room_models.StudyRoom)
-        .filter(room_models.StudyRoom.id == room_id)
-        .first()
+@router.get(
+    "/{room_id}/reports/cursor",
+    summary="List reports for a study room with cursor pagination",
+    response_model=CursorPage[study_material_schemas.StudyMaterialReportResponse],
+    dependencies=[Depends(query_budget(3))],
+)
+async def list_room_reports_cursor(
+    current_user: CurrentUser, session: SessionDep, room_id: UUID, params: CursorParamsDep
+) -> ModelResponse:
+    """List reports for a study room newest first, using an opaque `next_cursor` instead of offsets. Only room owners can view reports for their rooms."""
+    query = await _room_reports_query(session, current_user, room_id)
+    page = await cursor_paginate(
+        session, query, study_material_models.StudyMaterialReport, params
     )
-    if not room:
+    return ModelResponse(
+        CursorPage[study_material_schemas.StudyMaterialReportResponse].model_validate(page)
+    )
+
+
+@router.get(
+    "/{room_id}/reports/materials",
+    summary="List the reported materials of a study room",
+    response_model=LimitOffsetPage[study_material_schemas.ReportedMaterialResponse],
+    dependencies=[Depends(query_budget(4))],
+)
+async def list_reported_materials(
+    current_user: CurrentUser, session: SessionDep, room_id: UUID
+) -> ModelResponse:
+    """List the materials of a room with at least one report, most reported first. Only room owners can view them.
+
+    Includes materials hidden from the room's listing for having too many reports."""
+    await _check_room_owner(session, current_user, room_id)
+    material = study_material_models.StudyMaterial
+    # Served by the partial ix_study_materials_room_id_report_count index
+    query = (
+        select(material)
+        .options(joinedload(material.uploader))
+        .where(material.room_id == room_id, material.report_count > 0)
+        .order_by(
+            material.report_count.desc(),
+            material.created_at.desc(),
+            material.id.desc(),
+        )
+    )
+    return ModelResponse(await apaginate(session, query))
+
+
+async def _check_room_owner(session, current_user, room_id: UUID) -> None:
+    created_by = await session.scalar(
+        select(room_models.StudyRoom.created_by).where(
+            room_models.StudyRoom.id == room_id)
+    )
+    if created_by is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
         )
 
-    if room.created_by != current_user.id:
+    if created_by != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the owner can view reports for this study room",
         )
 
+
+async def _room_reports_query(session, current_user, room_id: UUID):
+    """Base query for a room's reports, after checking the user owns the room."""
+    await _check_room_owner(session, current_user, room_id)
+
     query = (
-        session.query(study_material_models.StudyMaterialReport)
+        select(study_material_models.StudyMaterialReport)
+        .join(study_material_models.StudyMaterialReport.material)
         .options(
             joinedload(study_material_models.StudyMaterialReport.reporter),
-            joinedload(study_material_models.StudyMaterialReport.material),
+            # reuse the join above instead of joining study_materials twice
+            contains_eager(study_material_models.StudyMaterialReport.material).joinedload(
+                study_material_models.StudyMaterial.uploader
+            ),
         )
-        .join(study_material_models.StudyMaterialReport.material)
-        .filter(study_material_models.StudyMaterial.room_id == room_id)
-        .order_by(study_material_models.StudyMaterialReport.created_at.desc())
+        .where(study_material_models.StudyMaterial.room_id == room_id)
     )
-    return paginate(session, query)
+    return query
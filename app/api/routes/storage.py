@@ -0,0 +1,82 @@
+"""Presigned URL targets of the local storage backend.
+
+Object stores serve presigned URLs themselves; with `STORAGE_BACKEND=local`
+the API plays that part, authorizing each request by its signed token
+rather than by the user's access token.
+"""
+
+import asyncio
+import os
+
+import jwt
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+
+from app.api.conditional import IMMUTABLE_CACHE_CONTROL
+from app.core import storage
+from app.core.security import decode_storage_token
+
+router = APIRouter(tags=["Storage"])
+
+
+def _claims(token: str, op: str) -> dict:
+    if not isinstance(storage.backend, storage.LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    try:
+        claims = decode_storage_token(token)
+    except jwt.PyJWTError:
+        claims = None
+    if not claims or claims.get("op") != op:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired storage URL",
+        )
+    return claims
+
+
+@router.put(
+    "/{token}",
+    summary="Upload to a presigned URL",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def put_object(token: str, request: Request) -> Response:
+    """Store the request body, which must match the size and SHA-256 the URL was issued for."""
+    claims = _claims(token, "put")
+
+    if request.headers.get("content-type") != "application/pdf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed"
+        )
+
+    temp_path, sha256, file_size = await storage.receive_stream(request.stream())
+    if sha256 != claims["sha256"] or file_size != claims["size"]:
+        await storage.discard(temp_path)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded content does not match the declared size and SHA-256",
+        )
+    await storage.backend.save(claims["key"], temp_path)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/{token}",
+    summary="Download from a presigned URL",
+    response_class=FileResponse,
+)
+async def get_object(token: str) -> Response:
+    claims = _claims(token, "get")
+    file_path = storage.backend.local_path(claims["key"])
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+        )
+    return FileResponse(
+        file_path,
+        media_type="application/pdf",
+        filename=claims["file_name"],
+        stat_result=stat_result,
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+    )
@@ -1,19 +1,45 @@
-import os
 import asyncio
+import html
+import os
+import time
 import uuid
-import aiofiles
-from fastapi_pagination.ext.sqlalchemy import paginate
+from datetime import datetime, timedelta, timezone
 from fastapi_pagination import LimitOffsetPage
-from fastapi import APIRouter, HTTPException, UploadFile, File, status
-from sqlalchemy import exists
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File, status
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
-from app.api.deps import CurrentUser, SessionDep
+from app.api.conditional import (
+    IMMUTABLE_CACHE_CONTROL,
+    is_not_modified,
+    make_etag,
+    not_modified,
+    set_validators,
+)
+from app.api.deps import CurrentUser, SessionDep, query_budget
+from app.api.pagination import CursorParamsDep, apaginate, cursor_paginate
+from app.api.responses import ModelResponse
 from app.schemas.study_material import (
     MaterialResponse,
+    MaterialSearchResult,
+    MaterialUploadConfirm,
+    MaterialUploadCreate,
+    MaterialUploadTicket,
+    PresignedDownload,
+    ResumableUploadCreate,
+    ResumableUploadStatus,
     StudyMaterialReportCreate,
     StudyMaterialReportResponse,
 )
-from app.models import room as study_room, study_material
+from app.models import room as study_room, study_material, user
+from app.schemas.pagination import CursorPage
+from app.core import storage
+from app.core.storage import resumable
+from app.core import jobs
+from app.core import metrics
+from app.worker.tasks import PROCESS_MATERIAL, REINDEX_ROOM, RELEASE_BLOBS
 from app.core.config import settings
 
 router = APIRouter(tags=["Study Materials"])
@@ -26,100 +52,599 @@ async def upload_study_material(
     room_id: uuid.UUID,
     file: UploadFile = File(...),
 ) -> MaterialResponse:
-    """Upload a new study material to a specific study room."""
+    """Upload a new study material to a specific study room.
+
+    The material is `processing` until a background worker has validated the
+    file, poll `GET /materials/{material_id}` for its status.
+
+    For large files prefer `POST /{room_id}/materials/uploads`, which sends
+    the file straight to storage instead of through the API."""
+    await _check_can_upload(session, current_user, room_id)
+
+    if file.content_type != "application/pdf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed"
+        )
+
+    start = time.perf_counter()
+    temp_path, sha256, file_size = await storage.receive_upload(file)
 
-    room = (
-        session.query(study_room.StudyRoom)
-        .filter(study_room.StudyRoom.id == room_id)
-        .first()
+    try:
+        await _lock_blob(session, sha256, file_size)
+        await storage.backend.save(storage.blob_key(sha256), temp_path)
+        metrics.MATERIAL_UPLOAD_BYTES.inc(file_size)
+        metrics.MATERIAL_UPLOAD_DURATION.observe(time.perf_counter() - start)
+        return await _add_material(session, current_user, room_id, file.filename, sha256)
+    except Exception:
+        # Cleanup on failure, the blob itself is reclaimed once unreferenced
+        await storage.discard(temp_path)
+        await session.rollback()
+        raise
+
+
+@router.post(
+    "/{room_id}/materials/uploads",
+    summary="Start a direct upload of study material",
+    dependencies=[Depends(query_budget(3))],
+)
+async def create_material_upload(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    upload: MaterialUploadCreate,
+) -> MaterialUploadTicket:
+    """Get a presigned URL to PUT a PDF directly to storage.
+
+    Send the file with the returned `headers`, then call
+    `POST /{room_id}/materials/confirm`. The file must be sent even when the
+    same content is already stored: confirming proves you have it."""
+    await _check_can_upload(session, current_user, room_id)
+
+    if upload.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File size exceeds 10MB limit",
+        )
+
+    expires_in = settings.STORAGE_URL_EXPIRE_SECONDS
+    presigned = storage.backend.upload_url(
+        storage.upload_key(current_user.id, upload.sha256),
+        upload.size,
+        upload.sha256,
+        expires_in,
+    )
+    return MaterialUploadTicket(
+        sha256=upload.sha256,
+        upload_url=presigned.url,
+        headers=presigned.headers,
+        expires_in=expires_in,
+    )
+
+
+@router.post(
+    "/{room_id}/materials/confirm",
+    summary="Confirm a direct upload of study material",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(7))],
+)
+async def confirm_material_upload(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    upload: MaterialUploadConfirm,
+) -> MaterialResponse:
+    """Record a study material for a file uploaded with `POST /{room_id}/materials/uploads`."""
+    await _check_can_upload(session, current_user, room_id)
+
+    upload_key = storage.upload_key(current_user.id, upload.sha256)
+    # Store the object while holding the blob lock, so it can't be released
+    # between storing it and our reference
+    await _lock_blob(session, upload.sha256, 0)
+    size = await storage.backend.size(upload_key)
+    if size is None:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The file has not been uploaded, start a new upload",
+        )
+    if size > settings.MAX_FILE_SIZE:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File size exceeds 10MB limit",
+        )
+    await storage.backend.move(upload_key, storage.blob_key(upload.sha256))
+    await session.execute(
+        update(study_material.MaterialBlob)
+        .where(study_material.MaterialBlob.sha256 == upload.sha256)
+        .values(size=size)
+    )
+    return await _add_material(
+        session, current_user, room_id, upload.file_name, upload.sha256
+    )
+
+
+async def _check_can_upload(session, current_user, room_id: uuid.UUID) -> None:
+    room = await session.scalar(
+        select(study_room.StudyRoom).where(study_room.StudyRoom.id == room_id)
     )
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
         )
 
-    is_member = session.query(
-        exists().where(
-            study_room.StudyRoomMember.study_room_id == room_id,
-            study_room.StudyRoomMember.user_id == current_user.id,
+    is_member = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoomMember.study_room_id == room_id,
+                study_room.StudyRoomMember.user_id == current_user.id,
+            )
         )
-    ).scalar()
+    )
     if not is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You must be a member of the study room to upload materials",
         )
 
-    if file.content_type != "application/pdf":
+
+async def _lock_blob(session, sha256: str, size: int) -> None:
+    """Create the blob row if needed and lock it until commit.
+
+    Holding the lock means a concurrent delete of the last material using the
+    same content can't remove the stored object before our new reference is
+    committed."""
+    await session.execute(
+        insert(study_material.MaterialBlob)
+        .values(sha256=sha256, size=size)
+        .on_conflict_do_update(
+            index_elements=[study_material.MaterialBlob.sha256],
+            set_={"sha256": sha256},
+        )
+    )
+
+
+async def _add_material(
+    session, current_user, room_id: uuid.UUID, file_name: str, sha256: str
+) -> study_material.StudyMaterial:
+    material = study_material.StudyMaterial(
+        room_id=room_id,
+        uploaded_by=current_user.id,
+        file_name=file_name,
+        file_url=storage.backend.url(storage.blob_key(sha256)),
+        blob_sha256=sha256,
+        status="processing",
+    )
+    session.add(material)
+    await session.flush()
+    # Validation and page counting run in the background, see app.worker.tasks
+    jobs.enqueue(session, PROCESS_MATERIAL, {"material_id": str(material.id)})
+    await session.commit()
+    await session.refresh(material, ["created_at", "uploader"])
+    return material
+
+
+@router.post(
+    "/{room_id}/materials/resumable",
+    summary="Start a resumable upload of study material",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(4))],
+)
+async def create_resumable_upload(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    upload: ResumableUploadCreate,
+    response: Response,
+) -> ResumableUploadStatus:
+    """Start an upload that can be sent in chunks and resumed after a failure.
+
+    PATCH chunks of `chunk_size` bytes (the last one may be shorter) to the
+    `Location`, with their byte offset in `Upload-Offset`. Chunks can be sent
+    in any order or in parallel; GET the upload to see which are missing,
+    then POST `.../complete` to record the material."""
+    await _check_can_upload(session, current_user, room_id)
+
+    if upload.size > settings.MAX_FILE_SIZE:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File size exceeds 10MB limit",
         )
 
-    room_dir = os.path.join(settings.MATERIAL_UPLOAD_DIR, str(room_id))
-    await asyncio.to_thread(os.makedirs, room_dir, exist_ok=True)
+    material_upload = study_material.MaterialUpload(
+        room_id=room_id,
+        uploaded_by=current_user.id,
+        file_name=upload.file_name,
+        size=upload.size,
+        chunk_size=settings.RESUMABLE_CHUNK_SIZE,
+        expires_at=datetime.now(timezone.utc)
+        + timedelta(seconds=settings.RESUMABLE_UPLOAD_TTL),
+    )
+    session.add(material_upload)
+    await session.flush()
+    await resumable.create_part(material_upload.id, upload.size)
+    try:
+        await session.commit()
+    except Exception:
+        await resumable.remove_part(material_upload.id)
+        raise
+
+    response.headers["Location"] = (
+        f"{settings.API_V1_STR}/rooms/materials/resumable/{material_upload.id}"
+    )
+    return _upload_status(material_upload, [])
+
+
+@router.get(
+    "/materials/resumable/{upload_id}",
+    summary="Get the progress of a resumable upload",
+    dependencies=[Depends(query_budget(3))],
+)
+async def get_resumable_upload(
+    current_user: CurrentUser,
+    session: SessionDep,
+    upload_id: uuid.UUID,
+    response: Response,
+) -> ResumableUploadStatus:
+    """Progress of one of your resumable uploads, also sent as the `Upload-Offset` header."""
+    material_upload = await _get_upload(session, current_user, upload_id)
+    upload_status = _upload_status(
+        material_upload, await _received_chunks(session, upload_id)
+    )
+    response.headers["Upload-Offset"] = str(upload_status.offset)
+    response.headers["Cache-Control"] = "no-store"
+    return upload_status
+
+
+@router.patch(
+    "/materials/resumable/{upload_id}",
+    summary="Send a chunk of a resumable upload",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(query_budget(5))],
+)
+async def upload_resumable_chunk(
+    current_user: CurrentUser,
+    session: SessionDep,
+    upload_id: uuid.UUID,
+    request: Request,
+    upload_offset: int = Header(alias="Upload-Offset", ge=0),
+) -> Response:
+    """Write the request body as the chunk starting at `Upload-Offset`.
+
+    Re-sending a chunk overwrites it, so failed chunks can simply be retried."""
+    material_upload = await _get_upload(session, current_user, upload_id)
+    chunk_size, size = material_upload.chunk_size, material_upload.size
+    if upload_offset % chunk_size or upload_offset >= size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload-Offset must be a multiple of {chunk_size} below {size}",
+        )
+    # Don't hold a pooled connection while the chunk is transferred
+    await session.commit()
+
+    length = min(chunk_size, size - upload_offset)
+    written = await resumable.write_chunk(
+        upload_id, upload_offset, length, request.stream()
+    )
+    if written != length:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk must be {length} bytes, got {written}",
+        )
+
+    try:
+        await session.execute(
+            insert(study_material.MaterialUploadChunk)
+            .values(upload_id=upload_id, index=upload_offset // chunk_size)
+            .on_conflict_do_nothing()
+        )
+    except IntegrityError:
+        # The upload was completed or cancelled while the chunk was sent
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+    await session.execute(
+        update(study_material.MaterialUpload)
+        .where(study_material.MaterialUpload.id == upload_id)
+        .values(
+            expires_at=func.now() + timedelta(seconds=settings.RESUMABLE_UPLOAD_TTL)
+        )
+    )
+    await session.commit()
+    offset, _ = resumable.received_offset(
+        await _received_chunks(session, upload_id), chunk_size, size
+    )
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(offset)}
+    )
 
-    file_id = str(uuid.uuid4())
-    file_path = os.path.join(room_dir, f"{file_id}.pdf")
 
-    file_size = 0
+@router.post(
+    "/materials/resumable/{upload_id}/complete",
+    summary="Complete a resumable upload",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(9))],
+)
+async def complete_resumable_upload(
+    current_user: CurrentUser, session: SessionDep, upload_id: uuid.UUID
+) -> MaterialResponse:
+    """Record the study material once every chunk of the upload has arrived."""
+    material_upload = await _get_upload(session, current_user, upload_id, lock=True)
+    await _check_can_upload(session, current_user, material_upload.room_id)
+
+    _, missing = resumable.received_offset(
+        await _received_chunks(session, upload_id),
+        material_upload.chunk_size,
+        material_upload.size,
+    )
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete, {len(missing)} chunks are missing",
+        )
 
     try:
-        async with aiofiles.open(file_path, "wb") as buffer:
-            # Checking the file size while reading it in chunks to avoid loading large files into memory
-            while chunk := await file.read(1024 * 1024):
-                file_size += len(chunk)
-
-                if file_size > settings.MAX_FILE_SIZE:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="File size exceeds 10MB limit",
-                    )
-                await buffer.write(chunk)
-
-        material = study_material.StudyMaterial(
-            room_id=room_id,
-            uploaded_by=current_user.id,
-            file_name=file.filename,
-            file_url=file_path,
-        )
-        session.add(material)
-        session.commit()
-        session.refresh(material)
-        return material
+        # No chunk may be written from hashing the file until it is stored
+        async with resumable.locked_part(upload_id):
+            sha256, head = await resumable.hash_part(upload_id)
+            if not head.startswith(b"%PDF-"):
+                await session.delete(material_upload)
+                await session.commit()
+                await resumable.remove_part(upload_id)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Only PDF files are allowed",
+                )
+
+            await _lock_blob(session, sha256, material_upload.size)
+            await storage.backend.save(
+                storage.blob_key(sha256), resumable.part_path(upload_id)
+            )
+        await session.delete(material_upload)
+        return await _add_material(
+            session, current_user, material_upload.room_id,
+            material_upload.file_name, sha256,
+        )
     except Exception:
-        # Cleanup on failure
-        if await asyncio.to_thread(os.path.exists, file_path):
-            await asyncio.to_thread(os.remove, file_path)
-        session.rollback()
+        # The partial file, if still there, goes with the upload when it expires
+        await session.rollback()
         raise
 
 
+@router.delete(
+    "/materials/resumable/{upload_id}",
+    summary="Cancel a resumable upload",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(query_budget(3))],
+)
+async def cancel_resumable_upload(
+    current_user: CurrentUser, session: SessionDep, upload_id: uuid.UUID
+) -> Response:
+    material_upload = await _get_upload(session, current_user, upload_id)
+    await session.delete(material_upload)
+    await session.commit()
+    await resumable.remove_part(upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _get_upload(
+    session, current_user, upload_id: uuid.UUID, lock: bool = False
+) -> study_material.MaterialUpload:
+    """One of the current user's unexpired resumable uploads."""
+    query = select(study_material.MaterialUpload).where(
+        study_material.MaterialUpload.id == upload_id,
+        study_material.MaterialUpload.uploaded_by == current_user.id,
+        study_material.MaterialUpload.expires_at > func.now(),
+    )
+    if lock:
+        query = query.with_for_update()
+    material_upload = await session.scalar(query)
+    if not material_upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+        )
+    return material_upload
+
+
+async def _received_chunks(session, upload_id: uuid.UUID) -> list[int]:
+    indexes = await session.scalars(
+        select(study_material.MaterialUploadChunk.index).where(
+            study_material.MaterialUploadChunk.upload_id == upload_id
+        )
+    )
+    return indexes.all()
+
+
+def _upload_status(material_upload, indexes: list[int]) -> ResumableUploadStatus:
+    offset, missing = resumable.received_offset(
+        indexes, material_upload.chunk_size, material_upload.size
+    )
+    return ResumableUploadStatus(
+        id=material_upload.id,
+        file_name=material_upload.file_name,
+        size=material_upload.size,
+        chunk_size=material_upload.chunk_size,
+        offset=offset,
+        missing_chunks=missing,
+        expires_at=material_upload.expires_at,
+    )
+
+
 @router.get(
     "/{room_id}/materials",
     summary="List study materials",
     response_model=LimitOffsetPage[MaterialResponse],
+    dependencies=[Depends(query_budget(6))],
 )
 async def list_study_materials(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    request: Request,
+) -> Response:
+    """List all study materials for a specific study room.
+
+    Materials reported by `MATERIAL_HIDE_REPORTERS` or more members are left
+    out. Supports `If-None-Match`, answering 304 when no material was added,
+    changed or removed since. There is no `Last-Modified`: removing an older
+    material leaves the latest `updated_at` as it was."""
+    query = await _materials_query(session, current_user, room_id)
+
+    # Cheap lookup of the room's material version before loading the page,
+    # uploaders are part of the response so their versions count too
+    latest, latest_uploader, total = (
+        await session.execute(
+            select(
+                func.max(study_material.StudyMaterial.updated_at),
+                func.max(user.User.updated_at),
+                func.count(),
+            )
+            .join(study_material.StudyMaterial.uploader)
+            .where(study_material.StudyMaterial.room_id == room_id)
+        )
+    ).one()
+    etag = make_etag(
+        room_id, latest.isoformat() if latest else None,
+        latest_uploader.isoformat() if latest_uploader else None, total,
+        settings.MATERIAL_HIDE_REPORTERS, sorted(request.query_params.multi_items()),
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    query = query.order_by(
+        study_material.StudyMaterial.created_at.desc(),
+        study_material.StudyMaterial.id.desc(),
+    )
+    response = ModelResponse(await apaginate(session, query))
+    set_validators(response, etag)
+    return response
+
+
+@router.get(
+    "/{room_id}/materials/cursor",
+    summary="List study materials with cursor pagination",
+    response_model=CursorPage[MaterialResponse],
+    dependencies=[Depends(query_budget(4))],
+)
+async def list_study_materials_cursor(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    params: CursorParamsDep,
+) -> ModelResponse:
+    """List study materials of a room newest first, using an opaque `next_cursor` instead of offsets."""
+    query = await _materials_query(session, current_user, room_id)
+    page = await cursor_paginate(session, query, study_material.StudyMaterial, params)
+    return ModelResponse(CursorPage[MaterialResponse].model_validate(page))
+
+
+# Control characters mark the matches, so the snippet can be escaped before
+# they become <mark> tags
+_HEADLINE_OPTIONS = (
+    "StartSel=\x02, StopSel=\x03, MaxFragments=2, MaxWords=20, MinWords=8, "
+    'FragmentDelimiter=" … "'
+)
+
+
+@router.get(
+    "/{room_id}/materials/search",
+    summary="Search the contents of study materials",
+    response_model=LimitOffsetPage[MaterialSearchResult],
+    dependencies=[Depends(query_budget(5))],
+)
+async def search_study_materials(
+    current_user: CurrentUser,
+    session: SessionDep,
+    room_id: uuid.UUID,
+    q: str = Query(min_length=1),
+) -> ModelResponse:
+    """Full-text search of the text in a room's PDFs, best matches first.
+
+    `q` takes web search syntax (`"exact phrase"`, `or`, `-excluded`). Files
+    are searchable once processed; scanned PDFs without a text layer never match."""
+    material = study_material.StudyMaterial
+    blob = study_material.MaterialBlob
+    ts_query = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank_cd(blob.search_vector, ts_query)
+    # Postgres computes the costly headlines after sorting, so only for the
+    # rows up to the end of the requested page
+    snippet = func.ts_headline("english", blob.content_text, ts_query, _HEADLINE_OPTIONS)
+
+    query = (
+        (await _materials_query(session, current_user, room_id))
+        .add_columns(rank, snippet)
+        .join(material.blob)
+        .where(blob.search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), material.created_at.desc(), material.id.desc())
+    )
+    return ModelResponse(await apaginate(session, query, transformer=_search_results))
+
+
+def _search_results(rows) -> list[dict]:
+    return [
+        {
+            "material": row[0],
+            "rank": row[1],
+            "snippet": html.escape(row[2])
+            .replace("\x02", "<mark>")
+            .replace("\x03", "</mark>"),
+        }
+        for row in rows
+    ]
+
+
+@router.post(
+    "/{room_id}/materials/reindex",
+    summary="Rebuild the search index of a room's materials",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(query_budget(3))],
+)
+async def reindex_study_materials(
     current_user: CurrentUser, session: SessionDep, room_id: uuid.UUID
-) -> LimitOffsetPage[MaterialResponse]:
-    """List all study materials for a specific study room."""
+) -> Response:
+    """Extract the text of every material in the room again, Only the room owner can do this.
+
+    Runs in the background in batches of `SEARCH_REINDEX_BATCH_SIZE` files;
+    the room stays searchable with its current index meanwhile."""
+    created_by = await session.scalar(
+        select(study_room.StudyRoom.created_by).where(
+            study_room.StudyRoom.id == room_id
+        )
+    )
+    if created_by is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
+        )
+    if created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the room owner can reindex its materials",
+        )
 
-    room = (
-        session.query(study_room.StudyRoom)
-        .filter(study_room.StudyRoom.id == room_id)
-        .first()
+    jobs.enqueue(session, REINDEX_ROOM, {"room_id": str(room_id)})
+    await session.commit()
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+async def _materials_query(session, current_user, room_id: uuid.UUID):
+    """Base query for a room's materials, after checking the user is a member."""
+    room = await session.scalar(
+        select(study_room.StudyRoom).where(study_room.StudyRoom.id == room_id)
     )
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study room not found"
         )
 
-    is_member = session.query(
-        exists().where(
-            study_room.StudyRoomMember.study_room_id == room_id,
-            study_room.StudyRoomMember.user_id == current_user.id,
+    is_member = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoomMember.study_room_id == room_id,
+                study_room.StudyRoomMember.user_id == current_user.id,
+            )
         )
-    ).scalar()
+    )
     if not is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -127,15 +652,206 @@ async def list_study_materials(
         )
 
     query = (
-        session.query(study_material.StudyMaterial)
+        select(study_material.StudyMaterial)
+        .options(joinedload(study_material.StudyMaterial.uploader))
+        .where(study_material.StudyMaterial.room_id == room_id)
+    )
+    if settings.MATERIAL_HIDE_REPORTERS:
+        query = query.where(
+            study_material.StudyMaterial.reporter_count
+            < settings.MATERIAL_HIDE_REPORTERS
+        )
+    return query
+
+
+@router.get(
+    "/materials/{material_id}",
+    summary="Get a study material",
+    dependencies=[Depends(query_budget(3))],
+)
+async def get_study_material(
+    current_user: CurrentUser, session: SessionDep, material_id: uuid.UUID
+) -> MaterialResponse:
+    """Get a study material, including its processing `status`. Only members of the study room can view it."""
+    material = await session.scalar(
+        select(study_material.StudyMaterial)
         .options(joinedload(study_material.StudyMaterial.uploader))
-        .filter(study_material.StudyMaterial.room_id == room_id)
-        .order_by(study_material.StudyMaterial.created_at.desc())
+        .where(study_material.StudyMaterial.id == material_id)
+    )
+    if not material:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Study material not found"
+        )
+
+    is_member = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoomMember.study_room_id == material.room_id,
+                study_room.StudyRoomMember.user_id == current_user.id,
+            )
+        )
+    )
+    if not is_member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You must be a member of the study room to view materials",
+        )
+    return material
+
+
+@router.get(
+    "/materials/{material_id}/download",
+    summary="Download a study material",
+    response_class=FileResponse,
+    responses={
+        206: {"description": "Partial content for a `Range` request"},
+        307: {"description": "Redirect to a presigned URL of the object storage"},
+    },
+    dependencies=[Depends(query_budget(3))],
+)
+async def download_study_material(
+    current_user: CurrentUser,
+    session: SessionDep,
+    material_id: uuid.UUID,
+    request: Request,
+) -> Response:
+    """Download the PDF of a study material, Only members of the study room can download it.
+
+    Supports `Range` / `If-Range` so viewers can fetch pages lazily, and
+    `If-None-Match` against the strong ETag, which is the content's SHA-256.
+    With object storage the client is redirected to a presigned URL instead."""
+    material = await _downloadable_material(session, current_user, material_id)
+    file_name, sha256 = material.file_name, material.blob_sha256
+    # Hand the connection back to the pool before a potentially slow transfer
+    await session.close()
+
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = storage.blob_key(sha256)
+    file_path = storage.backend.local_path(key)
+    if file_path is None:
+        return RedirectResponse(
+            storage.backend.download_url(
+                key, file_name, settings.STORAGE_URL_EXPIRE_SECONDS
+            ),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        )
+
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Material file not found"
+        )
+
+    # FileResponse streams in chunks (or hands the path to the server through
+    # the ASGI pathsend extension, for sendfile) and answers Range requests.
+    return FileResponse(
+        file_path,
+        media_type="application/pdf",
+        filename=file_name,
+        stat_result=stat_result,
+        headers=headers,
+    )
+
+
+@router.get(
+    "/materials/{material_id}/download-url",
+    summary="Get a presigned download URL for a study material",
+    dependencies=[Depends(query_budget(3))],
+)
+async def get_material_download_url(
+    current_user: CurrentUser, session: SessionDep, material_id: uuid.UUID
+) -> PresignedDownload:
+    """A short-lived URL to fetch the PDF without further authentication, Only members of the study room can get it."""
+    material = await _downloadable_material(session, current_user, material_id)
+    expires_in = settings.STORAGE_URL_EXPIRE_SECONDS
+    url = storage.backend.download_url(
+        storage.blob_key(material.blob_sha256), material.file_name, expires_in
+    )
+    return PresignedDownload(url=url, expires_in=expires_in)
+
+
+async def _downloadable_material(session, current_user, material_id: uuid.UUID):
+    """Load a material with a stored file, after checking the user is a member of its room."""
+    material = await session.scalar(
+        select(study_material.StudyMaterial).where(
+            study_material.StudyMaterial.id == material_id
+        )
+    )
+    if not material:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Study material not found"
+        )
+
+    is_member = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoomMember.study_room_id == material.room_id,
+                study_room.StudyRoomMember.user_id == current_user.id,
+            )
+        )
+    )
+    if not is_member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You must be a member of the study room to download materials",
+        )
+
+    # Materials whose file was already missing when blobs were introduced
+    if material.blob_sha256 is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Material file not found"
+        )
+    if material.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Material failed processing: {material.processing_error}",
+        )
+    return material
+
+
+@router.delete(
+    "/materials/{material_id}",
+    summary="Delete a study material",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(query_budget(4))],
+)
+async def delete_study_material(
+    current_user: CurrentUser, session: SessionDep, material_id: uuid.UUID
+) -> Response:
+    """Delete a study material, Only the uploader or the room owner can delete it.
+
+    The stored file is removed once no other material refers to the same content."""
+    material = await session.scalar(
+        select(study_material.StudyMaterial)
+        .options(joinedload(study_material.StudyMaterial.room))
+        .where(study_material.StudyMaterial.id == material_id)
     )
-    return paginate(session, query)
+    if not material:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Study material not found"
+        )
 
+    if current_user.id not in (material.uploaded_by, material.room.created_by):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the uploader or the room owner can delete this material",
+        )
 
-# TODO - Optional Add endpoints for downloading and deleting materials (only by uploader or room owner)
+    await session.execute(
+        delete(study_material.StudyMaterial).where(
+            study_material.StudyMaterial.id == material_id
+        )
+    )
+    if material.blob_sha256:
+        # The file is removed once this is committed, if no material uses it
+        jobs.enqueue(session, RELEASE_BLOBS, {"sha256s": [material.blob_sha256]})
+    await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post(
@@ -152,22 +868,24 @@ async def report_study_material(
 ) -> StudyMaterialReportResponse:
     """Report a study material, Only members of the study room can report materials in a room."""
 
-    material = (
-        session.query(study_material.StudyMaterial)
-        .filter(study_material.StudyMaterial.id == material_id)
-        .first()
+    material = await session.scalar(
+        select(study_material.StudyMaterial)
+        .options(joinedload(study_material.StudyMaterial.uploader))
+        .where(study_material.StudyMaterial.id == material_id)
     )
     if not material:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study material not found"
         )
 
-    is_member = session.query(
-        exists().where(
-            study_room.StudyRoomMember.study_room_id == material.room_id,
-            study_room.StudyRoomMember.user_id == current_user.id,
+    is_member = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoomMember.study_room_id == material.room_id,
+                study_room.StudyRoomMember.user_id == current_user.id,
+            )
         )
-    ).scalar()
+    )
     if not is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -184,7 +902,8 @@ async def report_study_material(
         material_id=material_id, reported_by=current_user.id, comment=report.comment
     )
     session.add(report)
-    session.commit()
+    await session.commit()
+    await session.refresh(report, ["created_at", "reporter", "material"])
     return report
 
 
@@ -192,28 +911,60 @@ async def report_study_material(
     "/materials/{material_id}/reports",
     summary="List reports for a study material",
     response_model=LimitOffsetPage[StudyMaterialReportResponse],
+    dependencies=[Depends(query_budget(5))],
 )
 async def list_material_reports(
     current_user: CurrentUser, session: SessionDep, material_id: uuid.UUID
-) -> LimitOffsetPage[StudyMaterialReportResponse]:
+) -> ModelResponse:
     """List all reports for a specific study material, Only room owners can view reports for materials in their rooms."""
+    query = await _material_reports_query(session, current_user, material_id)
+    query = query.order_by(
+        study_material.StudyMaterialReport.created_at.desc(),
+        study_material.StudyMaterialReport.id.desc(),
+    )
+    return ModelResponse(await apaginate(session, query))
 
-    material = (
-        session.query(study_material.StudyMaterial)
-        .filter(study_material.StudyMaterial.id == material_id)
-        .first()
+
+@router.get(
+    "/materials/{material_id}/reports/cursor",
+    summary="List reports for a study material with cursor pagination",
+    response_model=CursorPage[StudyMaterialReportResponse],
+    dependencies=[Depends(query_budget(4))],
+)
+async def list_material_reports_cursor(
+    current_user: CurrentUser,
+    session: SessionDep,
+    material_id: uuid.UUID,
+    params: CursorParamsDep,
+) -> ModelResponse:
+    """List reports for a study material newest first, using an opaque `next_cursor` instead of offsets. Only room owners can view them."""
+    query = await _material_reports_query(session, current_user, material_id)
+    page = await cursor_paginate(
+        session, query, study_material.StudyMaterialReport, params
+    )
+    return ModelResponse(CursorPage[StudyMaterialReportResponse].model_validate(page))
+
+
+async def _material_reports_query(session, current_user, material_id: uuid.UUID):
+    """Base query for a material's reports, after checking the user owns its room."""
+    material = await session.scalar(
+        select(study_material.StudyMaterial).where(
+            study_material.StudyMaterial.id == material_id
+        )
     )
     if not material:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study material not found"
         )
 
-    is_room_owner = session.query(
-        exists().where(
-            study_room.StudyRoom.id == material.room_id,
-            study_room.StudyRoom.created_by == current_user.id,
+    is_room_owner = await session.scalar(
+        select(
+            exists().where(
+                study_room.StudyRoom.id == material.room_id,
+                study_room.StudyRoom.created_by == current_user.id,
+            )
         )
-    ).scalar()
+    )
     if not is_room_owner:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -221,9 +972,13 @@ async def list_material_reports(
         )
 
     query = (
-        session.query(study_material.StudyMaterialReport)
-        .options(joinedload(study_material.StudyMaterialReport.reporter))
-        .filter(study_material.StudyMaterialReport.material_id == material_id)
-        .order_by(study_material.StudyMaterialReport.created_at.desc())
+        select(study_material.StudyMaterialReport)
+        .options(
+            joinedload(study_material.StudyMaterialReport.reporter),
+            joinedload(study_material.StudyMaterialReport.material).joinedload(
+                study_material.StudyMaterial.uploader
+            ),
+        )
+        .where(study_material.StudyMaterialReport.material_id == material_id)
     )
-    return paginate(session, query)
+    return query
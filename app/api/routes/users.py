@@ -1,32 +1,72 @@
-from fastapi import APIRouter, status, HTTPException, status
+from fastapi import APIRouter, Depends, Response, status, HTTPException, status
+from sqlalchemy import select
 from app.schemas import user as user_schema
+from app.schemas.batch import Batch
 from app.models import user as user_model
-from app.api.deps import SessionDep, CurrentUser
+from app.api.batch import BatchIdsDep, fetch_batch
+from app.api.deps import (
+    SessionDep,
+    CurrentUser,
+    get_current_active_superuser,
+    invalidate_cached_user,
+    query_budget,
+)
 from uuid import UUID
 router = APIRouter(tags=["users"])
 
 
 @router.get("/me")
-def get_current_user(current_user: CurrentUser) -> user_schema.UserBase:
+async def get_current_user(current_user: CurrentUser) -> user_schema.UserBase:
     return current_user
 
 
 @router.put("/me")
-def update_current_user(user_in: user_schema.UserUpdate, current_user: CurrentUser, session: SessionDep) -> user_schema.UserBase:
+async def update_current_user(user_in: user_schema.UserUpdate, current_user: CurrentUser, session: SessionDep) -> user_schema.UserBase:
     if user_in.name is not None:
         current_user.name = user_in.name
 
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    invalidate_cached_user(current_user.id)
+    await session.refresh(current_user)
     return current_user
 
 
+@router.get(
+    "/batch",
+    response_model=Batch[user_schema.UserOut],
+    dependencies=[Depends(query_budget(1))],
+)
+async def get_users_batch(
+    ids: BatchIdsDep, session: SessionDep
+) -> Batch[user_schema.UserOut]:
+    """Get several users in one request, in the order of `ids`. Unknown ids are listed in `missing`."""
+    return await fetch_batch(session, select(user_model.User), user_model.User, ids)
+
+
 @router.get("/{user_id}", response_model=user_schema.UserOut)
-def get_user(user_id: UUID, session: SessionDep) -> user_schema.UserOut:
-    user_obj = session.query(user_model.User).filter(
-        user_model.User.id == user_id).first()
+async def get_user(user_id: UUID, session: SessionDep) -> user_schema.UserOut:
+    user_obj = await session.scalar(select(user_model.User).where(
+        user_model.User.id == user_id))
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user_obj
+
+
+@router.post(
+    "/{user_id}/deactivate",
+    dependencies=[Depends(get_current_active_superuser)],
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def deactivate_user(user_id: UUID, session: SessionDep):
+    """Deactivate a user so their tokens are no longer accepted. Superusers only."""
+    user_obj = await session.scalar(select(user_model.User).where(
+        user_model.User.id == user_id))
+    if not user_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user_obj.is_active = False
+    await session.commit()
+    invalidate_cached_user(user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
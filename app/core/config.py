@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Literal
 
@@ -21,6 +22,25 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
+    # Connection pool, sized per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    # Set when connecting through PgBouncer in transaction pooling mode, which
+    # can't route server-side prepared statements back to the same backend
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+    # Fail requests that exceed their query budget or run N+1 queries
+    # instead of only logging them, meant for tests
+    DB_QUERY_BUDGET_STRICT: bool = False
+    # Log statements taking at least this long (0 disables the slow-query
+    # log) plus a sample of the others, and capture the plans of slow ones
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    SLOW_QUERY_SAMPLE_RATE: float = 0.0  # share of other statements logged
+    SLOW_QUERY_EXPLAIN: bool = True
+    SLOW_QUERY_EXPLAIN_INTERVAL: int = 300  # seconds before re-explaining a statement
+
     @property
     def SYNC_DATABASE_URL(self) -> str:
         if self.ENVIRONMENT in ["production", "staging"]:
@@ -37,13 +57,86 @@ class Settings(BaseSettings):
             f"/{self.POSTGRES_DB}"
         )
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """Same database as `SYNC_DATABASE_URL`, but using the asyncpg driver."""
+        url = self.SYNC_DATABASE_URL
+        for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+
     FIRST_SUPERUSER_EMAIL: str
     FIRST_SUPERUSER_PASSWORD: str
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # Dedicated pool for Argon2 hashing in register/login, per worker
+    PASSWORD_HASH_WORKERS: int = 2
+    # Requests allowed to wait for a hashing worker before answering 503
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+    # Hash in worker processes instead of threads
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+
+    # In-process cache of authenticated users, 0 disables it. Changes to a
+    # user only clear the cache of the worker that made them, so the other
+    # workers keep accepting a deactivated user, or their old privileges,
+    # for up to USER_CACHE_TTL seconds; hence the low cap
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: float = Field(5.0, ge=0, le=10)  # seconds
+
     MATERIAL_UPLOAD_DIR: str = "uploads/study_materials"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
 
+    # Where material files are stored, "s3" needs the `s3` extra (boto3).
+    # MATERIAL_UPLOAD_DIR is still used for temporary files of API uploads.
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_BUCKET: str | None = None
+    S3_ENDPOINT_URL: str | None = None  # e.g. a MinIO server, unset for AWS
+    S3_REGION: str | None = None
+    S3_ACCESS_KEY_ID: str | None = None
+    S3_SECRET_ACCESS_KEY: str | None = None
+    # Lifetime of presigned upload/download URLs
+    STORAGE_URL_EXPIRE_SECONDS: int = 15 * 60
+
+    # Resumable uploads
+    RESUMABLE_CHUNK_SIZE: int = 1024 * 1024  # 1 MiB
+    RESUMABLE_UPLOAD_TTL: int = 24 * 60 * 60  # seconds since the last chunk
+    RESUMABLE_GC_INTERVAL: int = 10 * 60  # seconds, 0 disables the sweep
+
+    # Background jobs, run by `python -m app.worker`
+    WORKER_PROCESSES: int = 1
+    WORKER_CONCURRENCY: int = 4  # jobs run at once by each worker process
+    JOB_POLL_INTERVAL: float = 1.0  # seconds between polls of an empty queue
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_DELAY: float = 5.0  # seconds, doubled on each retry
+    JOB_RETRY_MAX_DELAY: float = 10 * 60
+    JOB_TIMEOUT: float = 5 * 60  # running jobs older than this are requeued
+    JOB_RETENTION: int = 7 * 24 * 60 * 60  # seconds to keep finished jobs
+
+    # Materials reported by this many distinct members are hidden from room
+    # listings, 0 disables hiding
+    MATERIAL_HIDE_REPORTERS: int = 5
+
+    # Full-text search of material contents
+    MATERIAL_TEXT_MAX_CHARS: int = 500_000  # extracted text indexed per file
+    SEARCH_REINDEX_BATCH_SIZE: int = 20  # files re-extracted per transaction
+
+    # Schema written by `python -m app.core.openapi`, served instead of
+    # building it on the first request; empty to always build it
+    OPENAPI_SCHEMA_FILE: str = ""
+
+    # Seconds between adding buffered request metrics to the Prometheus
+    # metrics served at /metrics, which also adds them before each scrape
+    METRICS_FLUSH_INTERVAL: float = 1.0
+
+    # OpenTelemetry tracing, anything but "none" needs the `tracing` extra.
+    # "file" appends spans as JSON lines to TRACING_FILE, "otlp" sends them
+    # to the collector set by the OTEL_EXPORTER_OTLP_* variables
+    TRACING_EXPORTER: Literal["none", "console", "file", "otlp"] = "none"
+    TRACING_SAMPLE_RATE: float = 1.0  # share of requests traced
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "studyroom-api"
+
 
 settings = Settings()
@@ -1,13 +1,84 @@
-from sqlalchemy import select, create_engine
+import os
+import time
+import uuid
+from sqlalchemy import event, select, create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core import metrics, sql_log, tracing
 from app.core.config import settings
+from app.core.query_stats import current_query_stats
 from app.core.security import get_password_hash
 from app.schemas.user import UserCreate
 from app.core.base import Base
 
 
-# Synchronous engine + sessionmaker
-engine = create_engine(settings.SYNC_DATABASE_URL, echo=settings.DEBUG)
+class PoolWaitStats:
+    """Time spent waiting for a pooled connection in this worker process.
+
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+            metrics.DB_POOL_TIMEOUTS.inc()
+        else:
+            self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        metrics.DB_POOL_WAIT.observe(wait)
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """`AsyncAdaptedQueuePool` that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_wait_stats.record(time.perf_counter() - start)
+        return conn
+
+
+def _pool_options() -> dict:
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+
+def _async_connect_args() -> dict:
+    if not settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        return {}
+    # PgBouncer in transaction mode may run each statement on a different
+    # server connection, so asyncpg must not cache prepared statements and
+    # must use unique names for the unnamed ones it still prepares.
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+# Synchronous engine + sessionmaker, only used by Alembic and `initial_data.py`
+engine = create_engine(settings.SYNC_DATABASE_URL, **_pool_options())
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
@@ -15,6 +86,83 @@ SessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+# Asynchronous engine + sessionmaker used by the API request handlers
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=_async_connect_args(),
+    **_pool_options(),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+tracing.instrument_engine(async_engine.sync_engine)
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Timed outside requests too, for the slow-query log
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    sql_log.record(statement, parameters, elapsed, stats, executemany)
+
+
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _drop_query_timer(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _count_connection_opened(dbapi_connection, connection_record):
+    metrics.DB_POOL_CONNECTIONS.inc()
+
+
+@event.listens_for(async_engine.sync_engine, "close")
+def _count_connection_closed(dbapi_connection, connection_record):
+    metrics.DB_POOL_CONNECTIONS.dec()
+
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(async_engine.sync_engine, "checkin")
+def _count_checkin(dbapi_connection, connection_record):
+    metrics.DB_POOL_CHECKED_OUT.dec()
+
+
+def get_pool_stats() -> dict:
+    """Snapshot of the async engine's pool for the current worker process."""
+    pool = async_engine.pool
+    checkouts = pool_wait_stats.checkouts
+    return {
+        "pid": os.getpid(),
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # QueuePool reports a negative overflow until `pool_size` connections exist
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": pool_wait_stats.timeouts,
+        "avg_wait_ms": (pool_wait_stats.total_wait / checkouts * 1000) if checkouts else 0.0,
+        "max_wait_ms": pool_wait_stats.max_wait * 1000,
+    }
+
 
 def init_db(session: Session) -> None:
     # Local import to avoid circular import at module import time
@@ -0,0 +1,220 @@
+"""Durable background jobs stored in the `jobs` table.
+
+Jobs are enqueued with `enqueue` in the same transaction as the change that
+needs them, so they exist exactly when that change is committed. Worker
+processes (`python -m app.worker`) claim them one at a time with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so any number of workers can poll the
+table without blocking each other or running a job twice.
+
+A job whose handler raises is retried with exponential backoff until
+`max_attempts`; `PermanentJobError` fails it at once. Jobs left running by
+a worker that died are requeued once they exceed `JOB_TIMEOUT`.
+"""
+
+import logging
+import random
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+FailureHandler = Callable[[dict[str, Any], str], Awaitable[None]]
+
+_handlers: dict[str, tuple[JobHandler, FailureHandler | None]] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying can't succeed."""
+
+
+def job_handler(kind: str, on_failure: FailureHandler | None = None):
+    """Register the decorated coroutine as the handler of `kind` jobs.
+
+    `on_failure` is awaited with the payload and error once the job has
+    failed for good.
+    """
+
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = (handler, on_failure)
+        return handler
+
+    return register
+
+
+def enqueue(session: AsyncSession, kind: str, payload: dict[str, Any]) -> Job:
+    """Add a job to `session`, it's queued when the session commits."""
+    job = Job(kind=kind, payload=payload, max_attempts=settings.JOB_MAX_ATTEMPTS)
+    session.add(job)
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retrying a job that failed `attempts` times."""
+    delay = min(
+        settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY,
+    )
+    # Jitter, so jobs that failed together don't all retry together
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def claim_job(session: AsyncSession) -> Job | None:
+    """Mark the next due job as running and return it, None if there is none."""
+    next_job = (
+        select(Job.id)
+        .where(Job.status == "queued", Job.run_at <= func.now())
+        .order_by(Job.run_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    job = await session.scalar(
+        update(Job)
+        .where(Job.id == next_job)
+        .values(status="running", attempts=Job.attempts + 1, started_at=func.now())
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return job
+
+
+async def run_job(job: Job) -> None:
+    """Run a claimed job's handler and record the outcome."""
+    handler, on_failure = _handlers.get(job.kind, (None, None))
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind {job.kind!r}")
+        await handler(job.payload)
+    except Exception as exc:
+        if isinstance(exc, PermanentJobError):
+            error, permanent = str(exc), True
+        else:
+            error = f"{type(exc).__name__}: {exc}"
+            permanent = job.attempts >= job.max_attempts
+        logger.warning(
+            "Job %s (%s) attempt %d failed: %s", job.id, job.kind, job.attempts, error
+        )
+        async with AsyncSessionLocal() as session:
+            if permanent:
+                values = {"status": "failed", "finished_at": func.now()}
+            else:
+                values = {
+                    "status": "queued",
+                    "run_at": func.now()
+                    + timedelta(seconds=retry_delay(job.attempts)),
+                }
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(last_error=error, **values)
+            )
+            await session.commit()
+        if permanent and on_failure is not None:
+            await on_failure(job.payload, error)
+    else:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(status="done", finished_at=func.now(), last_error=None)
+            )
+            await session.commit()
+
+
+async def requeue_stale_jobs(session: AsyncSession) -> int:
+    """Requeue jobs running for longer than `JOB_TIMEOUT`, their worker is gone.
+
+    Jobs already out of attempts fail instead.
+    """
+    out_of_attempts = Job.attempts >= Job.max_attempts
+    stale = await session.scalars(
+        update(Job)
+        .where(
+            Job.status == "running",
+            Job.started_at
+            < func.now() - timedelta(seconds=settings.JOB_TIMEOUT),
+        )
+        .values(
+            status=case((out_of_attempts, "failed"), else_="queued"),
+            finished_at=case((out_of_attempts, func.now()), else_=None),
+            run_at=func.now(),
+            last_error="Timed out, the worker running it may have stopped",
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    stale = stale.all()
+    await session.commit()
+    for job in stale:
+        _, on_failure = _handlers.get(job.kind, (None, None))
+        if job.status == "failed" and on_failure is not None:
+            await on_failure(job.payload, job.last_error)
+    return len(stale)
+
+
+async def purge_finished_jobs(session: AsyncSession) -> int:
+    """Delete jobs finished longer than `JOB_RETENTION` seconds ago."""
+    result = await session.execute(
+        delete(Job).where(
+            Job.status.in_(("done", "failed")),
+            Job.finished_at
+            < func.now() - timedelta(seconds=settings.JOB_RETENTION),
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def queue_stats(session: AsyncSession, window: float = 300.0) -> dict:
+    """Queue depth by status, plus wait and run times of recently finished jobs."""
+    counts = dict(
+        (await session.execute(select(Job.status, func.count()).group_by(Job.status))).all()
+    )
+    ready, oldest_ready = (
+        await session.execute(
+            select(
+                func.count(),
+                func.extract("epoch", func.now() - func.min(Job.run_at)),
+            ).where(Job.status == "queued", Job.run_at <= func.now())
+        )
+    ).one()
+
+    wait = func.extract("epoch", Job.started_at - Job.run_at) * 1000
+    run = func.extract("epoch", Job.finished_at - Job.started_at) * 1000
+    recent = (
+        await session.execute(
+            select(
+                func.count(),
+                func.avg(wait),
+                func.percentile_cont(0.95).within_group(wait),
+                func.avg(run),
+                func.percentile_cont(0.95).within_group(run),
+            ).where(
+                Job.status == "done",
+                Job.finished_at >= func.now() - timedelta(seconds=window),
+            )
+        )
+    ).one()
+    return {
+        "queued": counts.get("queued", 0),
+        "ready": ready,
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_ready_age_s": float(oldest_ready or 0),
+        "window_s": window,
+        "finished_in_window": recent[0],
+        "avg_wait_ms": float(recent[1] or 0),
+        "p95_wait_ms": float(recent[2] or 0),
+        "avg_run_ms": float(recent[3] or 0),
+        "p95_run_ms": float(recent[4] or 0),
+    }
@@ -0,0 +1,231 @@
+"""Prometheus metrics for the API, served at `/metrics`.
+
+With several gunicorn workers set the `PROMETHEUS_MULTIPROC_DIR` environment
+variable (it is read when `prometheus_client` is imported, so it can't come
+from `.env`) to an empty directory: every worker then writes its samples
+there and `/metrics` aggregates all of them, whichever worker serves it.
+`gunicorn.conf.py` clears the directory on start and drops the live gauges
+of workers that exit.
+
+Request histograms and the in-progress count are first kept per worker and
+added to the Prometheus metrics every `METRICS_FLUSH_INTERVAL` seconds and
+before each scrape, which keeps the cost per request to a few microseconds.
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from app.core.query_stats import current_query_stats
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "MetricsMiddleware",
+    "flush",
+    "render_metrics",
+    "run_metrics_flush",
+]
+
+# Label of requests that matched no route, so 404 scans can't add series
+UNMATCHED_ROUTE = "<unmatched>"
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Its `_count` doubles as the request counter, one metric less to update
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route template and status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent running SQL statements, per request that ran any",
+    ["method", "route"],
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open database connections in the API's pools",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pools",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+)
+
+MATERIAL_UPLOAD_BYTES = Counter(
+    "material_upload_bytes_total",
+    "Bytes of study material uploaded through the API, `rate()` gives bytes/sec",
+)
+MATERIAL_UPLOAD_DURATION = Histogram(
+    "material_upload_seconds",
+    "Time to hash and store an uploaded study material",
+)
+
+
+class HistogramBuffer:
+    """Observations of one labelled histogram not yet added to it.
+
+    `Histogram.observe` takes a lock per bucket it walks; this only bumps a
+    list item. Only touched from the event loop thread, so no locking is
+    needed. Reads and updates `Histogram` internals, so pyproject.toml pins
+    prometheus-client to the minor version this was checked against.
+    """
+
+    __slots__ = ("child", "bounds", "counts", "total")
+
+    def __init__(self, child: Histogram) -> None:
+        self.child = child
+        self.bounds = child._upper_bounds
+        self.counts = [0] * len(self.bounds)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        # First bucket whose upper bound is >= value, like `Histogram.observe`
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def flush(self) -> None:
+        # prometheus_client has no bulk update, so add to the child's
+        # per-bucket values directly; same result as one `observe` per value
+        for i, count in enumerate(self.counts):
+            if count:
+                self.child._buckets[i].inc(count)
+                self.counts[i] = 0
+        if self.total:
+            self.child._sum.inc(self.total)
+            self.total = 0.0
+
+
+_buffers: list[HistogramBuffer] = []
+# Requests in progress in this worker, copied to REQUESTS_IN_PROGRESS on flush
+_in_progress = 0
+
+
+def buffered(histogram: Histogram, *labelvalues: str) -> HistogramBuffer:
+    buffer = HistogramBuffer(histogram.labels(*labelvalues))
+    _buffers.append(buffer)
+    return buffer
+
+
+def flush() -> None:
+    """Add the buffered observations to the metrics, from the event loop thread."""
+    for buffer in _buffers:
+        buffer.flush()
+    REQUESTS_IN_PROGRESS.set(_in_progress)
+
+
+async def run_metrics_flush(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        flush()
+
+
+def _registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+_scrape_registry = _registry()
+
+
+def render_metrics() -> bytes:
+    """All metrics in the Prometheus text format, of every worker in multiprocess mode."""
+    return generate_latest(_scrape_registry)
+
+
+class MetricsMiddleware:
+    """Records latency, status, size and DB time of each HTTP request.
+
+    Must run inside `QueryStatsMiddleware` to see the request's DB time.
+    Requests are labelled by route template (`/api/v1/rooms/{room_id}/join`),
+    known once routing has run. The buffers are cached per template, since
+    looking up a labelled metric costs more than observing a value.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._route_buffers: dict[tuple[str, str], tuple] = {}
+        self._durations: dict[tuple[str, str, int], HistogramBuffer] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        global _in_progress
+        _in_progress += 1
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _in_progress -= 1
+            self._observe(scope, status_code, size, time.perf_counter() - start)
+
+    def _observe(self, scope, status_code: int, size: int, elapsed: float) -> None:
+        route = getattr(scope.get("route"), "path_format", UNMATCHED_ROUTE)
+        key = (scope["method"], route)
+        buffers = self._route_buffers.get(key)
+        if buffers is None:
+            buffers = self._route_buffers[key] = (
+                buffered(RESPONSE_SIZE, *key), buffered(REQUEST_DB_TIME, *key)
+            )
+        response_size, db_time = buffers
+        response_size.observe(size)
+        stats = current_query_stats.get()
+        if stats is not None and stats.count:
+            db_time.observe(stats.total_time)
+
+        duration_key = (*key, status_code)
+        duration = self._durations.get(duration_key)
+        if duration is None:
+            duration = self._durations[duration_key] = buffered(
+                REQUEST_DURATION, *key, str(status_code)
+            )
+        duration.observe(elapsed)
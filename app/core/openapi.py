@@ -0,0 +1,77 @@
+"""OpenAPI schema written at build time.
+
+FastAPI builds the schema on the first request to `/api/v1/openapi.json`,
+which walks the models of every route and takes a few hundred milliseconds
+in each fresh worker. Write it once while building the release instead:
+
+    python -m app.core.openapi openapi.json
+
+and set `OPENAPI_SCHEMA_FILE=openapi.json`; the app then loads the file on
+the first request rather than building the schema. The file must come from
+the same code it is served with, `--check` exits non-zero when it doesn't
+match (e.g. in CI).
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def render_schema(app: FastAPI) -> str:
+    # The schema built from the routes, even if `use_schema_file` is in effect
+    return json.dumps(FastAPI.openapi(app), indent=2) + "\n"
+
+
+def use_schema_file(app: FastAPI, path: str) -> None:
+    """Make `app` serve the schema in `path`, built as usual if it can't be read."""
+    build_schema = app.openapi
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    app.openapi_schema = json.load(f)
+            except (OSError, ValueError) as exc:
+                logger.warning("Can't load OpenAPI schema from %s, building it: %s", path, exc)
+                return build_schema()
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write the API's OpenAPI schema to a file.")
+    parser.add_argument("output", help="path of the JSON file")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="don't write, exit with status 1 if the file differs from the schema",
+    )
+    args = parser.parse_args()
+
+    # Local import, `app.main` imports this module
+    from app.main import app
+
+    schema = render_schema(app)
+    if args.check:
+        try:
+            with open(args.output, encoding="utf-8") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != schema:
+            print(f"{args.output} is out of date, run: python -m app.core.openapi {args.output}")
+            return 1
+        return 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(schema)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Per-request SQL statement counting and N+1 detection.
+
+`app.core.db` feeds every statement executed on the async engine into the
+`QueryStats` of the current request, which `QueryStatsMiddleware` creates.
+Routes declare how many statements they may run with
+`app.api.deps.query_budget`.
+"""
+
+import logging
+from collections import Counter
+from contextvars import ContextVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# The same statement running this many times in one request looks like N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request breaks its query budget or runs N+1 queries."""
+
+
+class QueryStats:
+    def __init__(self, scope: dict | None = None) -> None:
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.budget: int | None = None
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[statement] += 1
+
+    @property
+    def route(self) -> str | None:
+        """Method and route template of the request, its path if no route matched."""
+        if self.scope is None:
+            return None
+        route = getattr(self.scope.get("route"), "path_format", None)
+        return f"{self.scope['method']} {route or self.scope['path']}"
+
+    def repeated_statements(self) -> list[tuple[str, int]]:
+        return [
+            (statement, times)
+            for statement, times in self.statements.items()
+            if times >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def problems(self) -> list[str]:
+        problems = []
+        if self.budget is not None and self.count > self.budget:
+            problems.append(
+                f"ran {self.count} SQL statements, budget is {self.budget}")
+        for statement, times in self.repeated_statements():
+            problems.append(
+                f"possible N+1, statement ran {times} times: {statement[:200]}")
+        return problems
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+class QueryStatsMiddleware:
+    """Collects `QueryStats` for each HTTP request.
+
+    Problems are logged, or raised as `QueryBudgetExceeded` when
+    `DB_QUERY_BUDGET_STRICT` is set (meant for tests). With `DEBUG` the
+    statement count and DB time are sent as `X-DB-Query-Count` and
+    `X-DB-Time-Ms` response headers.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+
+        async def send_with_stats(message) -> None:
+            if message["type"] == "http.response.start":
+                problems = stats.problems()
+                if problems:
+                    route = f"{scope['method']} {scope['path']}"
+                    if settings.DB_QUERY_BUDGET_STRICT:
+                        raise QueryBudgetExceeded(f"{route}: " + "; ".join(problems))
+                    for problem in problems:
+                        logger.warning("%s: %s", route, problem)
+                if settings.DEBUG:
+                    message.setdefault("headers", [])
+                    message["headers"] = [
+                        *message["headers"],
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_query_stats.reset(token)
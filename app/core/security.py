@@ -1,19 +1,29 @@
+import asyncio
+import functools
 import jwt
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 from pwdlib import PasswordHash
-from pwdlib.hashers.argon2 import Argon2Hasher
-from pwdlib.hashers.bcrypt import BcryptHasher
 
+from app.core import tracing
 from app.core.config import settings
 
-password_hash = PasswordHash(
-    (
-        Argon2Hasher(),
-        BcryptHasher(),
+
+@functools.cache
+def _password_hash() -> PasswordHash:
+    # Built on first use, so importing the app doesn't load argon2 and bcrypt
+    from pwdlib.hashers.argon2 import Argon2Hasher
+    from pwdlib.hashers.bcrypt import BcryptHasher
+
+    return PasswordHash(
+        (
+            Argon2Hasher(),
+            BcryptHasher(),
+        )
     )
-)
 
 
 ALGORITHM = "HS256"
@@ -36,11 +46,137 @@ def decode_access_token(token: str) -> dict:
     return payload
 
 
+# Audience of tokens that authorize a single storage request (the presigned
+# URLs of the local storage backend), so they can't be used as access tokens
+STORAGE_TOKEN_AUDIENCE = "storage"
+
+
+def create_storage_token(claims: dict[str, Any], expires_delta: timedelta) -> str:
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode = {**claims, "exp": expire, "aud": STORAGE_TOKEN_AUDIENCE}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_storage_token(token: str) -> dict:
+    """Decode a token made by `create_storage_token`.
+
+    Raises jwt.PyJWTError on failure.
+    """
+    return jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[ALGORITHM],
+        audience=STORAGE_TOKEN_AUDIENCE,
+    )
+
+
 def verify_password(
     plain_password: str, hashed_password: str
 ) -> tuple[bool, str | None]:
-    return password_hash.verify_and_update(plain_password, hashed_password)
+    return _password_hash().verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return password_hash.hash(password)
+    return _password_hash().hash(password)
+
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHashExecutor:
+    """Size-limited pool that runs password hashing off the event loop.
+
+    Argon2 is deliberately slow, so a burst of logins on Starlette's shared
+    threadpool would starve every other sync endpoint. This pool has its own
+    workers and rejects new work with `PasswordHasherBusy` once `max_queue`
+    calls are already waiting, instead of letting latency pile up.
+    """
+
+    def __init__(
+        self, max_workers: int, max_queue: int, use_processes: bool = False
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so importing the app doesn't spawn workers
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash",
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            raise PasswordHasherBusy()
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(fn, *args)
+        self._in_flight += 1
+        # Released when the work itself is done, not when the caller stops
+        # waiting: a cancelled login leaves its hash running on the worker
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Called from the worker thread, so `_in_flight` is only changed on the loop
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            # The loop is closed, nothing is left to admit
+            pass
+
+    def _decrement(self) -> None:
+        self._in_flight -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_executor = PasswordHashExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """`verify_password` on the password hashing pool.
+
+    Raises PasswordHasherBusy when the pool is saturated.
+    """
+    # Includes the wait for a free worker
+    with tracing.span("password.verify"):
+        return await password_hash_executor.run(
+            verify_password, plain_password, hashed_password
+        )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """`get_password_hash` on the password hashing pool.
+
+    Raises PasswordHasherBusy when the pool is saturated.
+    """
+    with tracing.span("password.hash"):
+        return await password_hash_executor.run(get_password_hash, password)
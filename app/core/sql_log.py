@@ -0,0 +1,131 @@
+"""Slow-query log with EXPLAIN plans.
+
+`app.core.db` passes every statement run on the async engine to `record`.
+Statements taking `SLOW_QUERY_THRESHOLD_MS` or longer are logged as
+warnings, and a `SLOW_QUERY_SAMPLE_RATE` share of the others at INFO, each
+as one JSON object with the duration, the statement (without parameters)
+and the route of the request that ran it.
+
+For a slow statement the plan is then captured in the background on a
+separate single-connection engine, so it never waits for or takes a
+connection from the request pool. `SELECT`s are run again with
+`EXPLAIN (ANALYZE, BUFFERS)` in a read-only transaction that is rolled
+back; anything else, including `SELECT ... FOR UPDATE`, only gets a plain
+`EXPLAIN`, since running it again could change data or take locks. Each
+statement is explained at most once per `SLOW_QUERY_EXPLAIN_INTERVAL`
+seconds and one plan is captured at a time, plans of slow statements
+arriving meanwhile are skipped.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.query_stats import QueryStats
+
+logger = logging.getLogger(__name__)
+
+# Longest an EXPLAIN ANALYZE may run before it is cancelled
+EXPLAIN_TIMEOUT_MS = 10_000
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b", re.I)
+
+_explained = TTLCache(maxsize=1024, ttl=settings.SLOW_QUERY_EXPLAIN_INTERVAL)
+_explain_task: asyncio.Task | None = None
+_explain_engine: AsyncEngine | None = None
+
+
+def record(
+    statement: str,
+    parameters,
+    elapsed: float,
+    stats: QueryStats | None,
+    executemany: bool = False,
+) -> None:
+    """Log `statement` if it was slow or sampled, and queue its EXPLAIN if slow."""
+    if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+        return
+    duration_ms = elapsed * 1000
+    slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+    if not slow and (
+        not settings.SLOW_QUERY_SAMPLE_RATE
+        or random.random() >= settings.SLOW_QUERY_SAMPLE_RATE
+    ):
+        return
+
+    entry = {
+        "event": "slow_query" if slow else "sampled_query",
+        "duration_ms": round(duration_ms, 2),
+        "route": stats.route if stats is not None else None,
+        "statement": statement,
+    }
+    logger.log(logging.WARNING if slow else logging.INFO, json.dumps(entry))
+    # Parameters of executemany are a list of rows, there's no single query to explain
+    if slow and settings.SLOW_QUERY_EXPLAIN and not executemany:
+        _schedule_explain(statement, parameters, entry)
+
+
+def _schedule_explain(statement: str, parameters, entry: dict) -> None:
+    global _explain_task
+    if _explain_task is not None and not _explain_task.done():
+        return
+    if _explained.get(statement) is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _explained.set(statement, True)
+    _explain_task = loop.create_task(_explain(statement, parameters, entry))
+
+
+def _engine() -> AsyncEngine:
+    global _explain_engine
+    if _explain_engine is None:
+        # Local import, `app.core.db` imports this module
+        from app.core.db import _async_connect_args
+
+        _explain_engine = create_async_engine(
+            settings.ASYNC_DATABASE_URL,
+            pool_size=1,
+            max_overflow=0,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args=_async_connect_args(),
+        )
+    return _explain_engine
+
+
+async def _explain(statement: str, parameters, entry: dict) -> None:
+    keyword = statement.split(None, 1)[0].upper()
+    analyze = keyword in ("SELECT", "WITH") and not _LOCKING_CLAUSE.search(statement)
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    try:
+        async with _engine().connect() as conn:
+            # Never committed: read-only, so a data-modifying CTE fails
+            # instead of running twice, and bounded by a timeout
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN ({options}) {statement}", parameters
+            )
+            plan = result.scalar_one()
+            await conn.rollback()
+    except Exception as exc:
+        logger.warning(json.dumps({**entry, "event": "explain_failed", "error": str(exc)}))
+        return
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    logger.warning(json.dumps({**entry, "event": "slow_query_plan", "analyze": analyze, "plan": plan}))
+
+
+async def close() -> None:
+    """Cancel a running EXPLAIN and close its connection."""
+    if _explain_task is not None:
+        _explain_task.cancel()
+    if _explain_engine is not None:
+        await _explain_engine.dispose()
@@ -0,0 +1,177 @@
+"""Content-addressed storage for uploaded study material files.
+
+Each distinct file is stored once, keyed by its SHA-256 and sharded into two
+levels of prefixes so no directory grows too large:
+
+    sha256/ab/cd/abcd...ef.pdf
+
+The key is resolved by the configured `StorageBackend`, either a directory
+on the local filesystem or an S3-compatible bucket. Uploads through the API
+are streamed to a temporary file while being hashed and then handed to the
+backend, so a stored object only ever holds complete content.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterator
+
+import aiofiles
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.storage.base import PresignedRequest, StorageBackend
+from app.core.storage.local import LocalStorage
+from app.models.study_material import MaterialBlob
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+__all__ = [
+    "PresignedRequest",
+    "StorageBackend",
+    "LocalStorage",
+    "backend",
+    "blob_key",
+    "upload_key",
+    "create_backend",
+    "discard",
+    "purge_stale_uploads",
+    "receive_stream",
+    "receive_upload",
+    "release_blobs",
+]
+
+
+def create_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        from app.core.storage.s3 import S3Storage
+
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorage(settings.MATERIAL_UPLOAD_DIR)
+
+
+backend = create_backend()
+
+
+def blob_key(sha256: str) -> str:
+    return f"sha256/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+
+
+def upload_key(user_id: uuid.UUID, sha256: str) -> str:
+    """Where a user's direct upload waits for `confirm`.
+
+    Separate per user and from the blobs, so confirming proves the user sent
+    the content rather than only knowing its hash.
+    """
+    return f"uploads/{user_id}/{sha256}.pdf"
+
+
+def _tmp_dir() -> str:
+    return os.path.join(settings.MATERIAL_UPLOAD_DIR, "tmp")
+
+
+async def receive_stream(chunks: AsyncIterator[bytes]) -> tuple[str, str, int]:
+    """Write `chunks` to a temporary file, hashing them on the way.
+
+    Returns `(temp_path, sha256, size)`. The caller must pass `temp_path` to
+    `backend.save` or `discard`.
+    """
+    await asyncio.to_thread(os.makedirs, _tmp_dir(), exist_ok=True)
+    temp_path = os.path.join(_tmp_dir(), f"{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    file_size = 0
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            # Checking the file size while reading it in chunks to avoid loading large files into memory
+            async for chunk in chunks:
+                file_size += len(chunk)
+
+                if file_size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="File size exceeds 10MB limit",
+                    )
+                digest.update(chunk)
+                with tracing.span("file.write", {"file.path": temp_path, "file.bytes": len(chunk)}):
+                    await buffer.write(chunk)
+    except BaseException:
+        await discard(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), file_size
+
+
+async def receive_upload(file: UploadFile) -> tuple[str, str, int]:
+    """`receive_stream` for a multipart upload."""
+
+    async def chunks() -> AsyncIterator[bytes]:
+        while chunk := await file.read(CHUNK_SIZE):
+            yield chunk
+
+    return await receive_stream(chunks())
+
+
+async def discard(temp_path: str) -> None:
+    if await asyncio.to_thread(os.path.exists, temp_path):
+        with tracing.span("file.remove", {"file.path": temp_path}):
+            await asyncio.to_thread(os.remove, temp_path)
+
+
+async def purge_stale_uploads(max_age: float) -> int:
+    """Remove direct uploads not confirmed within `max_age` seconds.
+
+    Only for the local backend; on an object store, expire the `uploads/`
+    prefix with a lifecycle rule instead.
+    """
+    root = backend.local_path("uploads")
+    if root is None:
+        return 0
+
+    def purge() -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    return await asyncio.to_thread(purge)
+
+
+async def release_blobs(session: AsyncSession, sha256s) -> None:
+    """Delete blobs no study material refers to anymore, rows and objects.
+
+    Run by the `release_blobs` job, which is enqueued with the deletion of
+    the materials and so only runs once that is committed. Commit right
+    after: the row delete locks each blob (and rechecks `ref_count` once it
+    has the lock) until then, so an upload of the same content waits for us
+    instead of finding an object that is about to disappear. When deleting
+    an object fails the rows are rolled back and the job retried.
+    """
+    sha256s = [sha256 for sha256 in set(sha256s) if sha256]
+    if not sha256s:
+        return
+    released = await session.scalars(
+        delete(MaterialBlob)
+        .where(MaterialBlob.sha256.in_(sha256s), MaterialBlob.ref_count == 0)
+        .returning(MaterialBlob.sha256)
+    )
+    for sha256 in released.all():
+        await backend.delete(blob_key(sha256))
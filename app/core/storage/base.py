@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+
+class PresignedRequest(NamedTuple):
+    """A URL the client may call directly, with the headers it must send."""
+
+    url: str
+    headers: dict[str, str]
+
+
+class StorageBackend(ABC):
+    """Where material blobs are kept.
+
+    Blobs are addressed by keys such as `sha256/ab/cd/<hash>.pdf`, see
+    `app.core.storage.blob_key`. Methods doing I/O are async and must not
+    block the event loop.
+    """
+
+    @abstractmethod
+    async def save(self, key: str, temp_path: str) -> None:
+        """Store a fully received local file under `key` and remove it.
+
+        When `key` already exists its content is the same, so the file is
+        just dropped.
+        """
+
+    @abstractmethod
+    async def move(self, source_key: str, key: str) -> None:
+        """Store the object at `source_key` under `key` and remove it.
+
+        Like `save`, when `key` already exists its content is the same.
+        """
+
+    @abstractmethod
+    async def size(self, key: str) -> int | None:
+        """Size of the stored object in bytes, None if it doesn't exist."""
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        """Whole content of the object, only for objects bounded by MAX_FILE_SIZE."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the object, if it exists."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Location recorded as `StudyMaterial.file_url`."""
+
+    @abstractmethod
+    def upload_url(
+        self, key: str, size: int, sha256: str, expires_in: int
+    ) -> PresignedRequest:
+        """A PUT request that stores exactly the content hashing to `sha256`."""
+
+    @abstractmethod
+    def download_url(self, key: str, file_name: str, expires_in: int) -> str:
+        """A GET URL for the object, served as an attachment named `file_name`."""
+
+    def local_path(self, key: str) -> str | None:
+        """Filesystem path of the object, when the API can serve it itself."""
+        return None
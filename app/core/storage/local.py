@@ -0,0 +1,76 @@
+import asyncio
+import os
+from datetime import timedelta
+
+import aiofiles
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.security import create_storage_token
+from app.core.storage.base import PresignedRequest, StorageBackend
+
+
+class LocalStorage(StorageBackend):
+    """Blobs as files under `root`, which every API worker must share.
+
+    Presigned URLs point at the API's own `/storage/{token}` route, with the
+    operation and its limits carried in a signed token.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    async def save(self, key: str, temp_path: str) -> None:
+        path = self.local_path(key)
+        if await asyncio.to_thread(os.path.exists, path):
+            with tracing.span("file.remove", {"file.path": temp_path}):
+                await asyncio.to_thread(os.remove, temp_path)
+        else:
+            await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+            with tracing.span("file.rename", {"file.path": path}):
+                await asyncio.to_thread(os.replace, temp_path, path)
+
+    async def move(self, source_key: str, key: str) -> None:
+        await self.save(key, self.local_path(source_key))
+
+    async def size(self, key: str) -> int | None:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, self.local_path(key))
+        except FileNotFoundError:
+            return None
+        return stat_result.st_size
+
+    async def read(self, key: str) -> bytes:
+        async with aiofiles.open(self.local_path(key), "rb") as f:
+            return await f.read()
+
+    async def delete(self, key: str) -> None:
+        path = self.local_path(key)
+        if await asyncio.to_thread(os.path.exists, path):
+            with tracing.span("file.remove", {"file.path": path}):
+                await asyncio.to_thread(os.remove, path)
+
+    def url(self, key: str) -> str:
+        return self.local_path(key)
+
+    def upload_url(
+        self, key: str, size: int, sha256: str, expires_in: int
+    ) -> PresignedRequest:
+        token = create_storage_token(
+            {"op": "put", "key": key, "size": size, "sha256": sha256},
+            timedelta(seconds=expires_in),
+        )
+        return PresignedRequest(
+            url=f"{settings.API_V1_STR}/storage/{token}",
+            headers={"Content-Type": "application/pdf"},
+        )
+
+    def download_url(self, key: str, file_name: str, expires_in: int) -> str:
+        token = create_storage_token(
+            {"op": "get", "key": key, "file_name": file_name},
+            timedelta(seconds=expires_in),
+        )
+        return f"{settings.API_V1_STR}/storage/{token}"
@@ -0,0 +1,212 @@
+"""Files and garbage collection of resumable uploads.
+
+A resumable upload owns one partial file, created at its final size (sparse
+where the filesystem allows it). Each chunk is written in place at its
+offset with `os.pwrite`, so chunks may arrive in any order or in parallel
+and the finished file is never reassembled or copied.
+
+Completing an upload hashes the file and moves it into blob storage, where
+other materials may share it. Writers take a shared `flock` around each
+write and check that the path still names the file they opened, while the
+completer holds an exclusive one (`locked_part`) from hashing until the
+file is stored. A chunk still in flight or re-sent late then fails instead
+of changing a stored blob after its hash was taken.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import AsyncIterator
+
+import aiofiles
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select
+
+from app.core import storage, tracing
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models.study_material import MaterialUpload
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB, for reading the finished file
+
+logger = logging.getLogger(__name__)
+
+
+def _parts_dir() -> str:
+    return os.path.join(settings.MATERIAL_UPLOAD_DIR, "tmp", "resumable")
+
+
+def part_path(upload_id: uuid.UUID) -> str:
+    return os.path.join(_parts_dir(), f"{upload_id}.part")
+
+
+def _create(path: str, size: int) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+async def create_part(upload_id: uuid.UUID, size: int) -> None:
+    await asyncio.to_thread(_create, part_path(upload_id), size)
+
+
+def _upload_gone() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Upload was completed or cancelled",
+    )
+
+
+def _write_at(fd: int, path: str, data: bytes, offset: int) -> None:
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    try:
+        # Once completed, the file we opened may be a stored blob
+        try:
+            is_part = os.path.samestat(os.fstat(fd), os.stat(path))
+        except FileNotFoundError:
+            is_part = False
+        if not is_part:
+            raise _upload_gone()
+        os.pwrite(fd, data, offset)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+async def write_chunk(
+    upload_id: uuid.UUID, offset: int, length: int, chunks: AsyncIterator[bytes]
+) -> int:
+    """Write up to `length` bytes from `chunks` at `offset`, returning the count.
+
+    Raises 400 when the body is longer than `length`, and 409 when the upload
+    is completed or cancelled meanwhile.
+    """
+    path = part_path(upload_id)
+    try:
+        fd = await asyncio.to_thread(os.open, path, os.O_WRONLY)
+    except FileNotFoundError:
+        raise _upload_gone()
+    written = 0
+    try:
+        async for data in chunks:
+            if written + len(data) > length:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Chunk is longer than {length} bytes",
+                )
+            with tracing.span("file.write", {"file.path": path, "file.bytes": len(data)}):
+                await asyncio.to_thread(_write_at, fd, path, data, offset + written)
+            written += len(data)
+    finally:
+        await asyncio.to_thread(os.close, fd)
+    return written
+
+
+@contextlib.asynccontextmanager
+async def locked_part(upload_id: uuid.UUID):
+    """Keep `write_chunk` from writing to the file while the block runs.
+
+    Waits for writes in progress. Raises 409 when the file is gone.
+    """
+    try:
+        fd = await asyncio.to_thread(os.open, part_path(upload_id), os.O_RDONLY)
+    except FileNotFoundError:
+        raise _upload_gone()
+    try:
+        await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        await asyncio.to_thread(os.close, fd)
+
+
+async def hash_part(upload_id: uuid.UUID) -> tuple[str, bytes]:
+    """SHA-256 of the finished file and its first bytes."""
+    digest = hashlib.sha256()
+    head = b""
+    async with aiofiles.open(part_path(upload_id), "rb") as f:
+        while chunk := await f.read(CHUNK_SIZE):
+            if not head:
+                head = chunk[:8]
+            digest.update(chunk)
+    return digest.hexdigest(), head
+
+
+async def remove_part(upload_id: uuid.UUID) -> None:
+    path = part_path(upload_id)
+    if await asyncio.to_thread(os.path.exists, path):
+        with tracing.span("file.remove", {"file.path": path}):
+            await asyncio.to_thread(os.remove, path)
+
+
+def received_offset(
+    indexes: list[int], chunk_size: int, size: int
+) -> tuple[int, list[int]]:
+    """Bytes received without gaps from the start, and the chunks still missing."""
+    received = set(indexes)
+    missing = [i for i in range(chunk_count(chunk_size, size)) if i not in received]
+    offset = missing[0] * chunk_size if missing else size
+    return offset, missing
+
+
+def chunk_count(chunk_size: int, size: int) -> int:
+    return -(-size // chunk_size)
+
+
+async def purge_expired_uploads() -> int:
+    """Remove expired uploads, and partial files whose upload row is gone.
+
+    Rows can also disappear through ON DELETE CASCADE from their room or
+    user, leaving the file behind until it's older than the upload TTL.
+    """
+    async with AsyncSessionLocal() as session:
+        expired = await session.scalars(
+            delete(MaterialUpload)
+            .where(MaterialUpload.expires_at < func.now())
+            .returning(MaterialUpload.id)
+        )
+        expired = expired.all()
+        await session.commit()
+        for upload_id in expired:
+            await remove_part(upload_id)
+
+        names = await asyncio.to_thread(
+            lambda: os.listdir(_parts_dir()) if os.path.isdir(_parts_dir()) else []
+        )
+        cutoff = time.time() - settings.RESUMABLE_UPLOAD_TTL
+        candidates = set()
+        for name in names:
+            try:
+                upload_id = uuid.UUID(name.removesuffix(".part"))
+                mtime = await asyncio.to_thread(os.path.getmtime, part_path(upload_id))
+            except (ValueError, FileNotFoundError):
+                continue
+            if mtime < cutoff:
+                candidates.add(upload_id)
+        orphans = []
+        if candidates:
+            alive = await session.scalars(
+                select(MaterialUpload.id).where(MaterialUpload.id.in_(candidates))
+            )
+            orphans = candidates - set(alive.all())
+            for upload_id in orphans:
+                await remove_part(upload_id)
+    return len(expired) + len(orphans)
+
+
+async def run_upload_gc(interval: float) -> None:
+    """Purge expired resumable and unconfirmed direct uploads every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await purge_expired_uploads()
+            removed += await storage.purge_stale_uploads(settings.RESUMABLE_UPLOAD_TTL)
+        except Exception:
+            logger.exception("Purging expired uploads failed")
+        else:
+            if removed:
+                logger.info("Purged %d expired uploads", removed)
@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import os
+from urllib.parse import quote
+
+from app.core import tracing
+from app.core.storage.base import PresignedRequest, StorageBackend
+
+
+class S3Storage(StorageBackend):
+    """Blobs in an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    Uploads through presigned URLs carry the SHA-256 as a signed
+    `x-amz-checksum-sha256` header, so the store itself rejects content that
+    doesn't match its key. Requires the optional `boto3` dependency.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+    ) -> None:
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as exc:
+            raise RuntimeError(
+                "STORAGE_BACKEND=s3 requires boto3, install the `s3` extra"
+            ) from exc
+
+        self.bucket = bucket
+        # Self-hosted stores generally don't resolve bucket subdomains
+        addressing_style = "path" if endpoint_url else "auto"
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(
+                signature_version="s3v4", s3={"addressing_style": addressing_style}
+            ),
+        )
+
+    async def save(self, key: str, temp_path: str) -> None:
+        try:
+            if await self.size(key) is None:
+                with tracing.span("s3.upload", {"s3.bucket": self.bucket, "s3.key": key}):
+                    await asyncio.to_thread(
+                        self._client.upload_file,
+                        temp_path,
+                        self.bucket,
+                        key,
+                        ExtraArgs={"ContentType": "application/pdf"},
+                    )
+        finally:
+            with tracing.span("file.remove", {"file.path": temp_path}):
+                await asyncio.to_thread(os.remove, temp_path)
+
+    async def move(self, source_key: str, key: str) -> None:
+        if await self.size(key) is None:
+            with tracing.span("s3.copy", {"s3.bucket": self.bucket, "s3.key": key}):
+                await asyncio.to_thread(
+                    self._client.copy_object,
+                    Bucket=self.bucket,
+                    Key=key,
+                    CopySource={"Bucket": self.bucket, "Key": source_key},
+                )
+        await self.delete(source_key)
+
+    async def size(self, key: str) -> int | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(
+                self._client.head_object, Bucket=self.bucket, Key=key
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def read(self, key: str) -> bytes:
+        def get() -> bytes:
+            response = self._client.get_object(Bucket=self.bucket, Key=key)
+            return response["Body"].read()
+
+        return await asyncio.to_thread(get)
+
+    async def delete(self, key: str) -> None:
+        with tracing.span("s3.delete", {"s3.bucket": self.bucket, "s3.key": key}):
+            await asyncio.to_thread(
+                self._client.delete_object, Bucket=self.bucket, Key=key
+            )
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def upload_url(
+        self, key: str, size: int, sha256: str, expires_in: int
+    ) -> PresignedRequest:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self._client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": "application/pdf",
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=expires_in,
+        )
+        return PresignedRequest(
+            url=url,
+            headers={
+                "Content-Type": "application/pdf",
+                "x-amz-checksum-sha256": checksum,
+            },
+        )
+
+    def download_url(self, key: str, file_name: str, expires_in: int) -> str:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseContentType": "application/pdf",
+                "ResponseContentDisposition": (
+                    f"attachment; filename*=utf-8''{quote(file_name)}"
+                ),
+            },
+            ExpiresIn=expires_in,
+        )
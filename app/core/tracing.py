@@ -0,0 +1,176 @@
+"""OpenTelemetry tracing of requests, SQL statements, file I/O and password hashing.
+
+Off unless `TRACING_EXPORTER` is set, which needs the `tracing` extra
+(`uv sync --extra tracing`). Each sampled request then gets a server span,
+continuing the trace of an incoming `traceparent` header, with a child span
+per SQL statement, file write or removal and password hash or verify.
+`TRACING_SAMPLE_RATE` is the share of requests that are traced.
+
+Exporters: `console` prints spans, `file` appends them as JSON lines to
+`TRACING_FILE` (both work offline), `otlp` sends them over OTLP/HTTP to the
+collector configured by the standard `OTEL_EXPORTER_OTLP_*` variables.
+
+With tracing off the middleware and SQL hooks aren't installed and `span`
+returns a shared no-op context manager, so the instrumented code pays one
+function call.
+"""
+
+import contextlib
+import os
+from typing import Any
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+__all__ = ["TracingMiddleware", "instrument_engine", "shutdown", "span", "tracer"]
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def _exporter():
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if settings.TRACING_EXPORTER == "file":
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    return ConsoleSpanExporter()
+
+
+def _create_provider():
+    if settings.TRACING_EXPORTER == "none":
+        return None
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    provider = TracerProvider(
+        resource=Resource.create(
+            {"service.name": settings.TRACING_SERVICE_NAME, "service.version": settings.APP_VERSION}
+        ),
+        # Requests that arrive with a sampled trace are always traced
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(provider)
+    return provider
+
+
+_provider = _create_provider()
+tracer = _provider.get_tracer(__name__) if _provider is not None else None
+
+if tracer is not None:
+    # Only installed with the `tracing` extra
+    from opentelemetry import propagate
+    from opentelemetry.trace import SpanKind, Status, StatusCode, get_current_span
+
+
+def span(name: str, attributes: dict[str, Any] | None = None):
+    """Context manager timing `name` as a child of the current span.
+
+    A no-op when tracing is off or the current request isn't sampled.
+    """
+    if tracer is None or not get_current_span().is_recording():
+        return _NO_SPAN
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def instrument_engine(engine) -> None:
+    """Add a span for each statement `engine` runs inside a traced request."""
+    if tracer is None:
+        return
+    database = engine.url.database
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_statement_span(conn, cursor, statement, parameters, context, executemany):
+        statement_span = None
+        if get_current_span().is_recording():
+            statement_span = tracer.start_span(
+                statement.split(None, 1)[0].upper(),
+                kind=SpanKind.CLIENT,
+                attributes={
+                    "db.system": "postgresql",
+                    "db.name": database,
+                    "db.statement": statement,
+                },
+            )
+        # Pushed even when not traced, so the pops below stay paired
+        conn.info.setdefault("trace_spans", []).append(statement_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_statement_span(conn, cursor, statement, parameters, context, executemany):
+        statement_span = conn.info["trace_spans"].pop()
+        if statement_span is not None:
+            statement_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _fail_statement_span(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if not spans:
+            return
+        statement_span = spans.pop()
+        if statement_span is not None:
+            statement_span.record_exception(exception_context.original_exception)
+            statement_span.set_status(Status(StatusCode.ERROR))
+            statement_span.end()
+
+
+class TracingMiddleware:
+    """Wraps each HTTP request in a server span named after its route template.
+
+    Only added to the app when tracing is on.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            method,
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as request_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path_format", None)
+                if route is not None:
+                    request_span.update_name(f"{method} {route}")
+                    request_span.set_attribute("http.route", route)
+                request_span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    request_span.set_status(Status(StatusCode.ERROR))
+
+
+def shutdown() -> None:
+    """Export the spans still buffered, call before the process exits."""
+    if _provider is not None:
+        _provider.shutdown()
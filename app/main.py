@@ -1,9 +1,36 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.api.main import api_router
+from app.core.db import async_engine
+from app.core import metrics, openapi, sql_log, tracing
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.security import password_hash_executor
+from app.core.storage.resumable import run_upload_gc
+from app.api.main import include_api_routers
 from fastapi_pagination import add_pagination
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    upload_gc = None
+    if settings.RESUMABLE_GC_INTERVAL > 0:
+        upload_gc = asyncio.create_task(run_upload_gc(settings.RESUMABLE_GC_INTERVAL))
+    metrics_flush = asyncio.create_task(
+        metrics.run_metrics_flush(settings.METRICS_FLUSH_INTERVAL)
+    )
+    yield
+    if upload_gc is not None:
+        upload_gc.cancel()
+    metrics_flush.cancel()
+    metrics.flush()
+    tracing.shutdown()
+    password_hash_executor.shutdown()
+    await sql_log.close()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
@@ -11,12 +38,29 @@ app = FastAPI(
     api_version=settings.APP_VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
+    lifespan=lifespan,
 )
 
 
-app.include_router(
-    prefix=settings.API_V1_STR,
-    router=api_router
-)
+# Added first so it runs inside QueryStatsMiddleware and sees each request's DB time
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+if tracing.tracer is not None:
+    # Outermost, so the request span covers all the other middleware
+    app.add_middleware(tracing.TracingMiddleware)
+
+include_api_routers(app, settings.API_V1_STR)
+
+add_pagination(app)
+
+if settings.OPENAPI_SCHEMA_FILE:
+    openapi.use_schema_file(app, settings.OPENAPI_SCHEMA_FILE)
+
 
-add_pagination(app)
\ No newline at end of file
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    # Flushed here, on the event loop thread that fills the buffers
+    metrics.flush()
+    body = await run_in_threadpool(metrics.render_metrics)
+    return Response(body, media_type=metrics.CONTENT_TYPE_LATEST)
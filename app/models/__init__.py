@@ -2,7 +2,24 @@
 for alembic to recognize them when generating migrations."""
 
 from .user import User
+from .job import Job
 from .room import StudyRoom, StudyRoomMember
-from .study_material import StudyMaterial
+from .study_material import (
+    MaterialBlob,
+    MaterialUpload,
+    MaterialUploadChunk,
+    StudyMaterial,
+    StudyMaterialReport,
+)
 
-__all__ = ["User", "StudyRoom", "StudyRoomMember", "StudyMaterial"]
+__all__ = [
+    "User",
+    "Job",
+    "StudyRoom",
+    "StudyRoomMember",
+    "MaterialBlob",
+    "MaterialUpload",
+    "MaterialUploadChunk",
+    "StudyMaterial",
+    "StudyMaterialReport",
+]
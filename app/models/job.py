@@ -0,0 +1,47 @@
+import uuid
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    text,
+    UUID,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.base import Base
+
+
+class Job(Base):
+    """A unit of background work, claimed by workers with SKIP LOCKED.
+
+    See app.core.jobs for the queue and app.worker for the worker processes.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # What workers scan when claiming the next job
+        Index(
+            "ix_jobs_queued_run_at",
+            "run_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, server_default="{}")
+    # queued -> running -> done | failed, or back to queued for a retry
+    status = Column(String, nullable=False, server_default="queued", index=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    max_attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job id={self.id} kind={self.kind} status={self.status}>"
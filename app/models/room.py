@@ -2,6 +2,8 @@ import uuid
 from app.core.base import Base
 from sqlalchemy import (
     Column,
+    Computed,
+    Index,
     String,
     DateTime,
     Integer,
@@ -10,11 +12,37 @@ from sqlalchemy import (
     func,
     UUID,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
+
+
+# Weighted document used for full-text search, name ranks above description
+STUDY_ROOM_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
 
 
 class StudyRoom(Base):
     __tablename__ = "study_rooms"
+    __table_args__ = (
+        # keyset pagination order, see app.api.pagination
+        Index("ix_study_rooms_created_at_id", "created_at", "id"),
+        Index("ix_study_rooms_search_vector", "search_vector", postgresql_using="gin"),
+        # pg_trgm indexes so substring (ILIKE '%term%') searches avoid a seq scan
+        Index(
+            "ix_study_rooms_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_study_rooms_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, index=True)
@@ -27,6 +55,13 @@ class StudyRoom(Base):
         nullable=False,
     )
     max_members = Column(Integer, nullable=False, default=10)
+    # Maintained by the `study_room_members_count` trigger on study_room_members,
+    # so it also follows rows removed by ON DELETE CASCADE
+    member_count = Column(Integer, nullable=False, server_default="0")
+    # Only used in WHERE/ORDER BY, so never loaded into Python
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(STUDY_ROOM_SEARCH_DOCUMENT, persisted=True))
+    )
     created_by = Column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -36,10 +71,16 @@ class StudyRoom(Base):
 
     creator = relationship("User", back_populates="created_study_rooms")
     members = relationship(
-        "StudyRoomMember", back_populates="study_room", cascade="all, delete-orphan"
+        "StudyRoomMember",
+        back_populates="study_room",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     materials = relationship(
-        "StudyMaterial", back_populates="room", cascade="all, delete-orphan"
+        "StudyMaterial",
+        back_populates="room",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -1,20 +1,72 @@
 import uuid
 from sqlalchemy import (
+    BigInteger,
     Column,
     DateTime,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
     String,
     String,
+    Text,
     func,
+    text,
     UUID,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.core.base import Base
 
 
+class MaterialBlob(Base):
+    """Uploaded file content, stored once per distinct SHA-256.
+
+    `ref_count` is the number of study materials using the blob and is kept by
+    the `material_blob_refs` trigger on study_materials, so it also follows
+    rows removed by ON DELETE CASCADE.
+
+    `content_text` is the text extracted by the `process_material` job, once
+    per content however many materials share it.
+    """
+
+    __tablename__ = "material_blobs"
+    __table_args__ = (
+        Index("ix_material_blobs_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    content_text = deferred(Column(Text, nullable=True))
+    # Set together with content_text rather than generated from it, as a
+    # generated column would be recomputed on every ref_count update
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+    # Null until the text has been extracted
+    indexed_at = Column(DateTime(timezone=True), nullable=True)
+
+    materials = relationship("StudyMaterial", back_populates="blob")
+
+    def __repr__(self):
+        return f"<MaterialBlob sha256={self.sha256} ref_count={self.ref_count}>"
+
+
 class StudyMaterial(Base):
     __tablename__ = "study_materials"
+    __table_args__ = (
+        # keyset pagination order, see app.api.pagination
+        Index("ix_study_materials_room_id_created_at_id", "room_id", "created_at", "id"),
+        # Reported materials of a room by report count, scanned backwards
+        Index(
+            "ix_study_materials_room_id_report_count",
+            "room_id",
+            "report_count",
+            "created_at",
+            "id",
+            postgresql_where=text("report_count > 0"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id = Column(
@@ -31,12 +83,33 @@ class StudyMaterial(Base):
     )
     file_name = Column(String, nullable=False)
     file_url = Column(String, nullable=False)
+    blob_sha256 = Column(
+        String(64), ForeignKey("material_blobs.sha256"), nullable=True, index=True
+    )
+    # processing -> ready | failed, set by the `process_material` job
+    status = Column(String, nullable=False, server_default="ready")
+    processing_error = Column(String, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    # Maintained by the `study_material_reports_count` trigger on
+    # study_material_reports, reporter_count counts each reporter once
+    report_count = Column(Integer, nullable=False, server_default="0")
+    reporter_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
 
     room = relationship("StudyRoom", back_populates="materials")
     uploader = relationship("User", back_populates="uploaded_materials")
+    blob = relationship("MaterialBlob", back_populates="materials")
     reports = relationship(
-        "StudyMaterialReport", back_populates="material", cascade="all, delete-orphan"
+        "StudyMaterialReport",
+        back_populates="material",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -45,6 +118,16 @@ class StudyMaterial(Base):
 
 class StudyMaterialReport(Base):
     __tablename__ = "study_material_reports"
+    __table_args__ = (
+        # keyset pagination order, see app.api.pagination
+        Index(
+            "ix_study_material_reports_material_id_created_at_id",
+            "material_id",
+            "created_at",
+            "id",
+        ),
+        Index("ix_study_material_reports_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     material_id = Column(
@@ -67,3 +150,59 @@ class StudyMaterialReport(Base):
 
     def __repr__(self):
         return f"<StudyMaterialReport id={self.id} comment={self.comment}>"
+
+
+class MaterialUpload(Base):
+    """A resumable upload in progress, see app.core.storage.resumable.
+
+    The file is written in place at `chunk_size` aligned offsets, each chunk
+    that arrived completely has a MaterialUploadChunk row. Uploads not touched
+    until `expires_at` are garbage collected.
+    """
+
+    __tablename__ = "material_uploads"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    room_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("study_rooms.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    uploaded_by = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    file_name = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    chunks = relationship(
+        "MaterialUploadChunk",
+        back_populates="upload",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    def __repr__(self):
+        return f"<MaterialUpload id={self.id} file_name={self.file_name}>"
+
+
+class MaterialUploadChunk(Base):
+    __tablename__ = "material_upload_chunks"
+
+    upload_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("material_uploads.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    index = Column(Integer, primary_key=True)
+
+    upload = relationship("MaterialUpload", back_populates="chunks")
+
+    def __repr__(self):
+        return f"<MaterialUploadChunk upload_id={self.upload_id} index={self.index}>"
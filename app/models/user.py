@@ -12,18 +12,24 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     last_login = Column(DateTime(timezone=True), server_default=func.now())
 
     created_study_rooms = relationship(
-        "StudyRoom", back_populates="creator", cascade="all, delete-orphan")
+        "StudyRoom", back_populates="creator", cascade="all, delete-orphan", passive_deletes=True)
     study_rooms_memberships = relationship(
-        "StudyRoomMember", back_populates="user", cascade="all, delete-orphan")
+        "StudyRoomMember", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     uploaded_materials = relationship(
-        "StudyMaterial", back_populates="uploader", cascade="all, delete-orphan")
+        "StudyMaterial", back_populates="uploader", cascade="all, delete-orphan", passive_deletes=True)
     reported_materials = relationship(
-        "StudyMaterialReport", back_populates="reporter", cascade="all, delete-orphan")
+        "StudyMaterialReport", back_populates="reporter", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<User id={self.id} email={self.email}>"
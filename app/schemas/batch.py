@@ -0,0 +1,15 @@
+from typing import Generic, TypeVar
+from uuid import UUID
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Batch(BaseModel, Generic[T]):
+    """Items found for a list of ids, in the requested order.
+
+    Requested ids that don't exist are listed in `missing`.
+    """
+
+    items: list[T]
+    missing: list[UUID]
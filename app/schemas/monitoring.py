@@ -0,0 +1,48 @@
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    """Connection pool usage of the worker process that served the request."""
+
+    pid: int
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class CacheStats(BaseModel):
+    """Hit/miss counters of an in-process cache in the serving worker."""
+
+    pid: int
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class JobQueueStats(BaseModel):
+    """Background job queue depth, and wait/run times of jobs finished within `window_s`.
+
+    `ready` jobs are queued and due now; wait time runs from when a job
+    became due until a worker picked it up."""
+
+    queued: int
+    ready: int
+    running: int
+    done: int
+    failed: int
+    oldest_ready_age_s: float
+    window_s: float
+    finished_in_window: int
+    avg_wait_ms: float
+    p95_wait_ms: float
+    avg_run_ms: float
+    p95_run_ms: float
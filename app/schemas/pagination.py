@@ -0,0 +1,16 @@
+from typing import Generic, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """A page of results ordered by `(created_at, id)`, newest first.
+
+    Pass `next_cursor` back as `cursor` to get the following page; it is
+    `None` on the last page.
+    """
+
+    items: list[T]
+    size: int
+    next_cursor: str | None = None
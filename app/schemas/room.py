@@ -21,8 +21,9 @@ class StudyRoomUpdate(BaseModel):
 class StudyRoomBase(BaseModel):
     id: UUID
     name: str
-    description: str = None
+    description: str | None = None
     max_members: int
+    member_count: int
     created_at: datetime
     updated_at: datetime
     creator: user_schemas.UserOut
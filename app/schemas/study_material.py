@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 from datetime import datetime
 from app.schemas import user as user_schemas
@@ -9,12 +9,29 @@ class MaterialResponse(BaseModel):
     room_id: UUID
     file_name: str
     file_url: str
+    # processing, ready or failed
+    status: str
+    processing_error: str | None = None
+    page_count: int | None = None
     created_at: datetime
     uploader: user_schemas.UserOut
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class ReportedMaterialResponse(MaterialResponse):
+    report_count: int
+    # Distinct members who reported it
+    reporter_count: int
+
+
+class MaterialSearchResult(BaseModel):
+    material: MaterialResponse
+    rank: float
+    # HTML-escaped excerpts with the matches wrapped in <mark></mark>
+    snippet: str
+
+
 class MaterialOut(BaseModel):
     id: UUID
     file_name: str
@@ -35,3 +52,47 @@ class StudyMaterialReportResponse(BaseModel):
 
 class StudyMaterialReportCreate(BaseModel):
     comment: str
+
+
+class MaterialUploadCreate(BaseModel):
+    """A file the client wants to upload directly to storage."""
+
+    file_name: str
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern="^[0-9a-f]{64}$")
+
+
+class MaterialUploadTicket(BaseModel):
+    """Where to PUT the file."""
+
+    sha256: str
+    upload_url: str
+    headers: dict[str, str]
+    expires_in: int
+
+
+class MaterialUploadConfirm(BaseModel):
+    file_name: str
+    sha256: str = Field(pattern="^[0-9a-f]{64}$")
+
+
+class PresignedDownload(BaseModel):
+    url: str
+    expires_in: int
+
+
+class ResumableUploadCreate(BaseModel):
+    file_name: str
+    size: int = Field(gt=0)
+
+
+class ResumableUploadStatus(BaseModel):
+    """`offset` counts the bytes received without gaps from the start."""
+
+    id: UUID
+    file_name: str
+    size: int
+    chunk_size: int
+    offset: int
+    missing_chunks: list[int]
+    expires_at: datetime
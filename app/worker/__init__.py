@@ -0,0 +1,85 @@
+"""Background job worker, run with `python -m app.worker`.
+
+Each worker process runs `WORKER_CONCURRENCY` claim loops on one event loop
+and periodically requeues jobs whose worker died and purges old finished
+jobs. Start as many processes, on as many hosts, as the queue needs; they
+coordinate only through the `jobs` table.
+"""
+
+import asyncio
+import logging
+import random
+import signal
+
+from app.core import jobs
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, async_engine
+from app.worker import tasks  # noqa: F401  registers the job handlers
+
+logger = logging.getLogger(__name__)
+
+# Seconds between requeueing stale jobs and purging old ones
+MAINTENANCE_INTERVAL = 60.0
+
+
+async def _sleep_unless_stopped(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _claim_loop(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as session:
+                job = await jobs.claim_job(session)
+        except Exception:
+            logger.exception("Claiming a job failed")
+            job = None
+        if job is None:
+            # Spread the polls of idle loops over the interval
+            await _sleep_unless_stopped(
+                stop, settings.JOB_POLL_INTERVAL * random.uniform(0.5, 1.5)
+            )
+            continue
+        await jobs.run_job(job)
+
+
+async def _maintenance_loop(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as session:
+                requeued = await jobs.requeue_stale_jobs(session)
+                purged = await jobs.purge_finished_jobs(session)
+            if requeued or purged:
+                logger.info("Requeued %d stale jobs, purged %d old jobs", requeued, purged)
+        except Exception:
+            logger.exception("Job queue maintenance failed")
+        await _sleep_unless_stopped(stop, MAINTENANCE_INTERVAL)
+
+
+async def run_worker(concurrency: int) -> None:
+    """Run jobs until SIGINT/SIGTERM, then finish the running ones and return."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Worker started with %d claim loops", concurrency)
+    try:
+        await asyncio.gather(
+            _maintenance_loop(stop),
+            *(_claim_loop(stop) for _ in range(concurrency)),
+        )
+    finally:
+        await async_engine.dispose()
+    logger.info("Worker stopped")
+
+
+def run_process(concurrency: int) -> None:
+    """Entry point of one worker process."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(process)d %(name)s %(message)s"
+    )
+    asyncio.run(run_worker(concurrency))
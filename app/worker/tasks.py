@@ -0,0 +1,194 @@
+"""Job handlers, registered with `app.core.jobs` when imported."""
+
+import asyncio
+import io
+import uuid
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, select, update
+
+from app.core import jobs, storage
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.jobs import PermanentJobError, job_handler
+from app.models.study_material import MaterialBlob, StudyMaterial
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+PROCESS_MATERIAL = "process_material"
+REINDEX_ROOM = "reindex_room"
+RELEASE_BLOBS = "release_blobs"
+
+# Postgres text can't hold NUL, and \x02/\x03 mark matches in search snippets
+_STRIPPED_CHARS = dict.fromkeys([0x00, 0x02, 0x03])
+
+
+def inspect_pdf(data: bytes, with_text: bool = True) -> tuple[int | None, str | None]:
+    """Validate `data` as a PDF and return its page count and text.
+
+    The text is capped at `MATERIAL_TEXT_MAX_CHARS`, and empty for scanned or
+    password protected files. It is None when `with_text` is false.
+    """
+    if not data.startswith(b"%PDF-"):
+        raise PermanentJobError("Not a PDF file")
+    if b"%%EOF" not in data[-1024:]:
+        raise PermanentJobError("Truncated PDF file")
+
+    # Imported here, the API imports this module only for the job names
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted and not _decrypt(reader):
+            return None, "" if with_text else None
+        page_count = len(reader.pages)
+    except Exception as exc:
+        # pypdf raises all sorts of errors on malformed files
+        raise PermanentJobError(f"Unreadable PDF file: {exc}") from exc
+    if not with_text:
+        return page_count, None
+
+    parts, length = [], 0
+    for page in reader.pages:
+        try:
+            page_text = page.extract_text()
+        except Exception:
+            # One broken page shouldn't keep the others out of the index
+            continue
+        parts.append(page_text)
+        length += len(page_text)
+        if length >= settings.MATERIAL_TEXT_MAX_CHARS:
+            break
+    text = "\n".join(parts)[: settings.MATERIAL_TEXT_MAX_CHARS]
+    return page_count, text.translate(_STRIPPED_CHARS)
+
+
+def _decrypt(reader: "PdfReader") -> bool:
+    # Most protected files only restrict editing and open without a password
+    try:
+        return bool(reader.decrypt(""))
+    except Exception:
+        # e.g. AES encryption without the `cryptography` package
+        return False
+
+
+async def _store_text(session, sha256: str, text: str) -> None:
+    await session.execute(
+        update(MaterialBlob)
+        .where(MaterialBlob.sha256 == sha256)
+        .values(
+            content_text=text,
+            search_vector=func.to_tsvector("english", text),
+            indexed_at=func.now(),
+        )
+    )
+
+
+async def _material_failed(payload: dict, error: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(StudyMaterial)
+            .where(
+                StudyMaterial.id == uuid.UUID(payload["material_id"]),
+                StudyMaterial.status == "processing",
+            )
+            .values(status="failed", processing_error=error)
+        )
+        await session.commit()
+
+
+@job_handler(PROCESS_MATERIAL, on_failure=_material_failed)
+async def process_material(payload: dict) -> None:
+    """Check an uploaded file really is a PDF, count its pages and index its text.
+
+    The text is extracted once per content, later uploads of the same file
+    reuse it.
+    """
+    material_id = uuid.UUID(payload["material_id"])
+    async with AsyncSessionLocal() as session:
+        row = (
+            await session.execute(
+                select(
+                    StudyMaterial.status,
+                    StudyMaterial.blob_sha256,
+                    MaterialBlob.indexed_at,
+                )
+                .join(StudyMaterial.blob)
+                .where(StudyMaterial.id == material_id)
+            )
+        ).one_or_none()
+    # Deleted, or already handled by an earlier attempt
+    if row is None or row.status != "processing":
+        return
+    sha256 = row.blob_sha256
+
+    data = await storage.backend.read(storage.blob_key(sha256))
+    page_count, text = await asyncio.to_thread(
+        inspect_pdf, data, row.indexed_at is None
+    )
+
+    async with AsyncSessionLocal() as session:
+        if text is not None:
+            await _store_text(session, sha256, text)
+        await session.execute(
+            update(StudyMaterial)
+            .where(
+                StudyMaterial.id == material_id,
+                StudyMaterial.status == "processing",
+            )
+            .values(status="ready", page_count=page_count, processing_error=None)
+        )
+        await session.commit()
+
+
+@job_handler(REINDEX_ROOM)
+async def reindex_room(payload: dict) -> None:
+    """Re-extract the text of the next batch of a room's files, then queue the rest.
+
+    Each batch is one short transaction that only locks its own blob rows,
+    so uploads and searches carry on while a large room is reindexed.
+    """
+    room_id = uuid.UUID(payload["room_id"])
+    async with AsyncSessionLocal() as session:
+        sha256s = (
+            await session.scalars(
+                select(StudyMaterial.blob_sha256)
+                .where(
+                    StudyMaterial.room_id == room_id,
+                    StudyMaterial.blob_sha256 > payload.get("after", ""),
+                )
+                .distinct()
+                .order_by(StudyMaterial.blob_sha256)
+                .limit(settings.SEARCH_REINDEX_BATCH_SIZE)
+            )
+        ).all()
+
+    texts = {}
+    for sha256 in sha256s:
+        key = storage.blob_key(sha256)
+        # Deleted since the batch was selected
+        if await storage.backend.size(key) is None:
+            continue
+        data = await storage.backend.read(key)
+        try:
+            _, texts[sha256] = await asyncio.to_thread(inspect_pdf, data)
+        except PermanentJobError:
+            texts[sha256] = ""
+
+    async with AsyncSessionLocal() as session:
+        for sha256, text in texts.items():
+            await _store_text(session, sha256, text)
+        if len(sha256s) == settings.SEARCH_REINDEX_BATCH_SIZE:
+            jobs.enqueue(
+                session, REINDEX_ROOM, {"room_id": str(room_id), "after": sha256s[-1]}
+            )
+        await session.commit()
+
+
+@job_handler(RELEASE_BLOBS)
+async def release_blobs(payload: dict) -> None:
+    """Remove the files of deleted materials that no other material uses."""
+    async with AsyncSessionLocal() as session:
+        await storage.release_blobs(session, payload["sha256s"])
+        await session.commit()
@@ -0,0 +1,144 @@
+"""Hundreds of clients joining the same study room at once.
+
+Seeds a room and `--clients` users directly in the database, fires all joins
+concurrently and checks that the room never ends up with more than
+`max_members` members. Runs the app in-process unless `--base-url` points
+at a running server. Example:
+
+    python -m benchmarks.join_concurrency --clients 500 --max-members 100
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import delete, func, insert, select
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.security import create_access_token, get_password_hash
+from app.models import StudyRoom, StudyRoomMember, User
+from benchmarks.stats import summarize
+
+
+def seed(clients: int, max_members: int) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    hashed_password = get_password_hash("bench-password")
+    user_ids = [uuid.uuid4() for _ in range(clients + 1)]
+    room_id = uuid.uuid4()
+    with SessionLocal() as session:
+        session.execute(insert(User), [
+            {
+                "id": user_id,
+                "name": f"join-bench-{i}",
+                "email": f"join-bench-{user_id}@example.com",
+                "hashed_password": hashed_password,
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+        session.execute(insert(StudyRoom).values(
+            id=room_id, name="join-bench", max_members=max_members, created_by=user_ids[0]
+        ))
+        session.execute(insert(StudyRoomMember).values(
+            id=uuid.uuid4(), study_room_id=room_id, user_id=user_ids[0]
+        ))
+        session.commit()
+    return room_id, user_ids
+
+
+def cleanup(user_ids: list[uuid.UUID]) -> None:
+    # Rooms and memberships go with their users through ON DELETE CASCADE
+    with SessionLocal() as session:
+        session.execute(delete(User).where(User.id.in_(user_ids)))
+        session.commit()
+
+
+def room_counts(room_id: uuid.UUID) -> tuple[int, int, int]:
+    with SessionLocal() as session:
+        room = session.get(StudyRoom, room_id)
+        actual = session.scalar(
+            select(func.count()).where(StudyRoomMember.study_room_id == room_id)
+        )
+        return room.max_members, room.member_count, actual
+
+
+async def run(args: argparse.Namespace, room_id: uuid.UUID, user_ids: list[uuid.UUID]) -> dict:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        )
+    tokens = [
+        create_access_token(user_id, timedelta(minutes=10)) for user_id in user_ids[1:]
+    ]
+    outcomes: Counter[str] = Counter()
+    latencies: list[float] = []
+
+    async def join(token: str) -> None:
+        for _ in range(args.attempts):
+            start = time.perf_counter()
+            response = await client.post(
+                f"{settings.API_V1_STR}/rooms/{room_id}/join",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            latencies.append(time.perf_counter() - start)
+            if response.status_code == 204:
+                outcomes["joined"] += 1
+            elif response.status_code == 400 and "full" in response.text:
+                outcomes["full"] += 1
+            elif response.status_code == 400 and "already" in response.text:
+                outcomes["already_member"] += 1
+            else:
+                outcomes[f"http_{response.status_code}"] += 1
+
+    async with client:
+        start = time.perf_counter()
+        await asyncio.gather(*(join(token) for token in tokens))
+        elapsed = time.perf_counter() - start
+    return {**summarize(latencies, elapsed), "outcomes": dict(outcomes)}
+
+
+def main(args: argparse.Namespace) -> dict:
+    room_id, user_ids = seed(args.clients, args.max_members)
+    try:
+        result = asyncio.run(run(args, room_id, user_ids))
+        max_members, member_count, actual = room_counts(room_id)
+    finally:
+        if not args.keep:
+            cleanup(user_ids)
+
+    joined = result["outcomes"].get("joined", 0)
+    result.update(
+        max_members=max_members,
+        member_count=member_count,
+        actual_members=actual,
+        correct=actual <= max_members and actual == member_count == joined + 1,
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--max-members", type=int, default=100)
+    parser.add_argument("--attempts", type=int, default=1,
+                        help="joins per client, >1 exercises the already-member path")
+    parser.add_argument("--base-url", help="e.g. http://localhost:8000, default runs in-process")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = main(args)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if not result["correct"]:
+        raise SystemExit("member count check failed")
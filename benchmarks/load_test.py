@@ -0,0 +1,406 @@
+"""End-to-end load test with a seeded dataset and per-route latency report.
+
+Seeds users, rooms, memberships, materials and reports in the database
+configured in `.env` (apply migrations first), then `--clients` virtual
+users run a weighted mix of logins, room listings and searches, joins and
+leaves, uploads and material listings for `--duration` seconds. Throughput
+and p50/p95/p99 per route go to `--json`; with `--baseline` the run is
+compared against an earlier report and exits non-zero on a regression.
+Runs the app in-process unless `--base-url` points at a running server.
+Example:
+
+    python -m benchmarks.load_test --clients 32 --duration 60 --json load.json
+    python -m benchmarks.load_test --clients 32 --duration 60 --baseline load.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core import storage
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, SessionLocal
+from app.core.security import create_access_token, get_password_hash
+from app.models import (
+    MaterialBlob,
+    StudyMaterial,
+    StudyMaterialReport,
+    StudyRoom,
+    StudyRoomMember,
+    User,
+)
+from benchmarks.stats import summarize
+from initial_data import placeholder_pdf as seed_pdf
+
+PASSWORD = "load-test-password"
+TOPICS = [
+    "algebra", "biology", "calculus", "chemistry", "economics",
+    "history", "literature", "physics", "programming", "statistics",
+]
+# Relative weight of each scenario in the default mix
+DEFAULT_MIX = {
+    "login": 5,
+    "list_rooms": 20,
+    "search_rooms": 15,
+    "get_room": 10,
+    "join_leave": 10,
+    "list_materials": 30,
+    "upload_material": 10,
+}
+
+
+def placeholder_pdf(label: str) -> bytes:
+    """A small valid one-page PDF, distinct for every `label`."""
+    return seed_pdf([[f"Load test {label}"]])
+
+
+@dataclass
+class Dataset:
+    run_id: str
+    user_ids: list[uuid.UUID]
+    emails: list[str]
+    room_ids: list[uuid.UUID]
+    # Rooms each user is a member of, and the ones they own
+    memberships: dict[uuid.UUID, set[uuid.UUID]]
+    owned: dict[uuid.UUID, set[uuid.UUID]]
+    blob_sha256s: set[str] = field(default_factory=set)
+
+
+async def store_placeholder_blob() -> str:
+    async def chunks():
+        yield placeholder_pdf("seed")
+
+    temp_path, sha256, size = await storage.receive_stream(chunks())
+    await storage.backend.save(storage.blob_key(sha256), temp_path)
+    with SessionLocal() as session:
+        session.execute(
+            pg_insert(MaterialBlob)
+            .values(sha256=sha256, size=size)
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+    return sha256
+
+
+def seed(args: argparse.Namespace, blob_sha256: str) -> Dataset:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hash(PASSWORD)
+    user_ids = [uuid.uuid4() for _ in range(args.users)]
+    emails = [f"load-{run_id}-{i}@example.com" for i in range(args.users)]
+    room_ids = [uuid.uuid4() for _ in range(args.rooms)]
+    owners = [rng.choice(user_ids) for _ in room_ids]
+
+    memberships = defaultdict(set)
+    owned = defaultdict(set)
+    for room_id, owner in zip(room_ids, owners):
+        memberships[owner].add(room_id)
+        owned[owner].add(room_id)
+    for user_id in user_ids:
+        for room_id in rng.sample(room_ids, min(args.rooms_per_user, len(room_ids))):
+            memberships[user_id].add(room_id)
+    members_by_room = defaultdict(list)
+    for user_id, rooms in memberships.items():
+        for room_id in rooms:
+            members_by_room[room_id].append(user_id)
+
+    materials = []
+    for room_id in room_ids:
+        for i in range(rng.randint(0, 2 * args.materials_per_room)):
+            materials.append({
+                "id": uuid.uuid4(),
+                "room_id": room_id,
+                "uploaded_by": rng.choice(members_by_room[room_id]),
+                "file_name": f"notes-{i}.pdf",
+                "file_url": storage.backend.url(storage.blob_key(blob_sha256)),
+                "blob_sha256": blob_sha256,
+                "status": "ready",
+                "page_count": 1,
+            })
+    reports = []
+    for _ in range(args.reports if materials else 0):
+        material = rng.choice(materials)
+        reports.append({
+            "id": uuid.uuid4(),
+            "material_id": material["id"],
+            "reported_by": rng.choice(members_by_room[material["room_id"]]),
+            "comment": "Load test report",
+        })
+
+    with SessionLocal() as session:
+        session.execute(insert(User), [
+            {"id": user_id, "name": f"Load user {i}", "email": email,
+             "hashed_password": hashed_password}
+            for i, (user_id, email) in enumerate(zip(user_ids, emails))
+        ])
+        session.execute(insert(StudyRoom), [
+            {"id": room_id, "name": f"{rng.choice(TOPICS)} study group {i}",
+             "description": f"Load test room about {rng.choice(TOPICS)}",
+             "max_members": args.max_members, "created_by": owner}
+            for i, (room_id, owner) in enumerate(zip(room_ids, owners))
+        ])
+        session.execute(insert(StudyRoomMember), [
+            {"id": uuid.uuid4(), "study_room_id": room_id, "user_id": user_id}
+            for room_id, members in members_by_room.items()
+            for user_id in members
+        ])
+        if materials:
+            session.execute(insert(StudyMaterial), materials)
+        if reports:
+            session.execute(insert(StudyMaterialReport), reports)
+        session.commit()
+
+    print(
+        f"seeded {len(user_ids)} users, {len(room_ids)} rooms, "
+        f"{sum(len(m) for m in members_by_room.values())} memberships, "
+        f"{len(materials)} materials, {len(reports)} reports"
+    )
+    return Dataset(
+        run_id, user_ids, emails, room_ids, memberships, owned, {blob_sha256}
+    )
+
+
+async def cleanup(dataset: Dataset) -> None:
+    # Rooms, memberships, materials and reports go with their users through
+    # ON DELETE CASCADE; blobs nothing refers to anymore are released after
+    with SessionLocal() as session:
+        session.execute(delete(User).where(User.id.in_(dataset.user_ids)))
+        session.commit()
+    async with AsyncSessionLocal() as session:
+        await storage.release_blobs(session, dataset.blob_sha256s)
+        await session.commit()
+
+
+class Recorder:
+    """Latencies and unexpected statuses per route, after the warmup."""
+
+    def __init__(self, warmup_until: float) -> None:
+        self.warmup_until = warmup_until
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, client: httpx.AsyncClient, route: str, method: str, url: str,
+        ok: tuple[int, ...] = (200,), **kwargs,
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, settings.API_V1_STR + url, **kwargs)
+        if start >= self.warmup_until:
+            self.latencies[route].append(time.perf_counter() - start)
+            if response.status_code not in ok:
+                self.errors[route] += 1
+        return response
+
+
+class VirtualUser:
+    """One client session, every client plays a different seeded user."""
+
+    def __init__(self, dataset: Dataset, index: int, rng: random.Random) -> None:
+        self.dataset = dataset
+        self.user_id = dataset.user_ids[index]
+        self.email = dataset.emails[index]
+        self.rooms = dataset.memberships[self.user_id]
+        self.owned = dataset.owned[self.user_id]
+        self.rng = rng
+        token = create_access_token(self.user_id, timedelta(hours=1))
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def login(self, client, rec: Recorder) -> None:
+        await rec.request(
+            client, "POST /auth/login", "POST", "/auth/login",
+            data={"username": self.email, "password": PASSWORD},
+        )
+
+    async def list_rooms(self, client, rec: Recorder) -> None:
+        await rec.request(
+            client, "GET /rooms/", "GET", "/rooms/", headers=self.headers,
+            params={"limit": 20, "offset": self.rng.randrange(0, 100, 20)},
+        )
+
+    async def search_rooms(self, client, rec: Recorder) -> None:
+        await rec.request(
+            client, "GET /rooms/?search", "GET", "/rooms/", headers=self.headers,
+            params={"search": self.rng.choice(TOPICS), "limit": 20},
+        )
+
+    async def get_room(self, client, rec: Recorder) -> None:
+        room_id = self.rng.choice(self.dataset.room_ids)
+        await rec.request(
+            client, "GET /rooms/{room_id}", "GET", f"/rooms/{room_id}",
+            headers=self.headers,
+        )
+
+    async def join_leave(self, client, rec: Recorder) -> None:
+        room_id = self.rng.choice(self.dataset.room_ids)
+        if room_id in self.rooms:
+            if room_id in self.owned:
+                return
+            route, action = "POST /rooms/{room_id}/leave", "leave"
+        else:
+            route, action = "POST /rooms/{room_id}/join", "join"
+        response = await rec.request(
+            client, route, "POST", f"/rooms/{room_id}/{action}",
+            # A join may find the room full
+            ok=(204, 400), headers=self.headers,
+        )
+        if response.status_code == 204:
+            if action == "join":
+                self.rooms.add(room_id)
+            else:
+                self.rooms.discard(room_id)
+
+    async def list_materials(self, client, rec: Recorder) -> None:
+        room_id = self.rng.choice(sorted(self.rooms))
+        await rec.request(
+            client, "GET /rooms/{room_id}/materials", "GET",
+            f"/rooms/{room_id}/materials", headers=self.headers,
+            params={"limit": 20},
+        )
+
+    async def upload_material(self, client, rec: Recorder) -> None:
+        room_id = self.rng.choice(sorted(self.rooms))
+        content = placeholder_pdf(uuid.uuid4().hex)
+        self.dataset.blob_sha256s.add(hashlib.sha256(content).hexdigest())
+        await rec.request(
+            client, "POST /rooms/{room_id}/materials", "POST",
+            f"/rooms/{room_id}/materials", headers=self.headers,
+            files={"file": ("upload.pdf", content, "application/pdf")},
+        )
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, value.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = int(weight)
+    return mix
+
+
+async def run(args: argparse.Namespace, dataset: Dataset) -> dict:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        )
+    scenarios = [name for name, weight in args.mix.items() if weight > 0]
+    weights = [args.mix[name] for name in scenarios]
+    start = time.perf_counter()
+    rec = Recorder(warmup_until=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+
+    async def client_loop(index: int) -> None:
+        rng = random.Random(args.seed * 1_000_003 + index)
+        user = VirtualUser(dataset, index, rng)
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            await getattr(user, scenario)(client, rec)
+
+    async with client:
+        await asyncio.gather(*(client_loop(i) for i in range(args.clients)))
+    elapsed = time.perf_counter() - start - args.warmup
+
+    routes = {
+        route: {**summarize(latencies, elapsed), "errors": rec.errors[route]}
+        for route, latencies in sorted(rec.latencies.items())
+    }
+    all_latencies = [x for latencies in rec.latencies.values() for x in latencies]
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in ("clients", "duration", "users", "rooms", "rooms_per_user",
+                        "materials_per_room", "reports", "seed", "mix")
+        },
+        "total": {**summarize(all_latencies, elapsed), "errors": sum(rec.errors.values())},
+        "routes": routes,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Routes whose p95 grew or throughput dropped by more than `tolerance`."""
+    regressions = []
+    for route, stats in result["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if not base:
+            continue
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{route}: p95 {base['p95_ms']:.1f}ms -> {stats['p95_ms']:.1f}ms"
+            )
+        if stats["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{route}: throughput {base['throughput']:.1f}/s -> {stats['throughput']:.1f}/s"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> dict:
+    if args.clients > args.users:
+        raise SystemExit("--clients can't exceed --users, each client plays one user")
+    blob_sha256 = await store_placeholder_blob()
+    dataset = seed(args, blob_sha256)
+    try:
+        result = await run(args, dataset)
+    finally:
+        if not args.keep:
+            await cleanup(dataset)
+
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:<36} {stats['throughput']:8.1f}/s p50={stats['p50_ms']:7.1f}ms "
+            f"p95={stats['p95_ms']:7.1f}ms p99={stats['p99_ms']:7.1f}ms "
+            f"errors={stats['errors']}"
+        )
+    total = result["total"]
+    print(f"{'total':<36} {total['throughput']:8.1f}/s errors={total['errors']}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds left out of the report")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--rooms-per-user", type=int, default=3)
+    parser.add_argument("--max-members", type=int, default=200)
+    parser.add_argument("--materials-per-room", type=int, default=10, help="average")
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="scenario weights, e.g. login=0,upload_material=20")
+    parser.add_argument("--base-url", help="e.g. http://localhost:8000, default runs in-process")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative p95 increase / throughput drop")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regressions against {args.baseline}")
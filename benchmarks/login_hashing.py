@@ -0,0 +1,101 @@
+"""Login throughput and tail latency at different password hashing pool sizes.
+
+Runs the app in-process against the database configured in `.env`, so
+run migrations first. Example:
+
+    python -m benchmarks.login_hashing --pool-sizes 1 2 4 8 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.core import security
+from app.core.config import settings
+from app.main import app
+from benchmarks.stats import summarize
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-password"
+
+
+async def ensure_user(client: httpx.AsyncClient) -> None:
+    response = await client.post(
+        f"{settings.API_V1_STR}/auth/register",
+        json={"name": "Bench", "email": EMAIL, "password": PASSWORD},
+    )
+    if response.status_code not in (201, 400):
+        response.raise_for_status()
+
+
+async def run_round(
+    client: httpx.AsyncClient, concurrency: int, duration: float
+) -> dict:
+    latencies: list[float] = []
+    rejected = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal rejected, errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(
+                f"{settings.API_V1_STR}/auth/login",
+                data={"username": EMAIL, "password": PASSWORD},
+            )
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            elif response.status_code == 503:
+                rejected += 1
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies, elapsed), "rejected_503": rejected, "errors": errors}
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await ensure_user(client)
+        for pool_size in args.pool_sizes:
+            security.password_hash_executor = security.PasswordHashExecutor(
+                max_workers=pool_size,
+                max_queue=args.max_queue,
+                use_processes=args.processes,
+            )
+            try:
+                result = await run_round(client, args.concurrency, args.duration)
+            finally:
+                security.password_hash_executor.shutdown()
+            result = {"pool_size": pool_size, **result}
+            results.append(result)
+            print(
+                f"pool={pool_size:<3} logins/s={result['throughput']:8.1f} "
+                f"p50={result['p50_ms']:8.1f}ms p99={result['p99_ms']:8.1f}ms "
+                f"503={result['rejected_503']} errors={result['errors']}"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per pool size")
+    parser.add_argument("--max-queue", type=int, default=settings.PASSWORD_HASH_MAX_QUEUE)
+    parser.add_argument("--processes", action="store_true", help="hash in worker processes")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
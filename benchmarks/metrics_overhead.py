@@ -0,0 +1,83 @@
+"""Per-request cost of `MetricsMiddleware`.
+
+Drives a minimal ASGI app that has already matched a route directly, with
+and without the middleware, so the difference is the middleware alone.
+Also times one flush of the buffered observations, which runs once per
+`METRICS_FLUSH_INTERVAL` rather than per request.
+Needs no database. Set `PROMETHEUS_MULTIPROC_DIR` to an empty directory to
+measure the multiprocess mode used under gunicorn. Example:
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.routing import APIRoute
+
+from app.core import metrics
+from app.core.query_stats import QueryStats, current_query_stats
+
+ROUTE = APIRoute("/api/v1/rooms/{room_id}/join", lambda: None, methods=["POST"])
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b'{"message":"Joined"}'}
+
+
+async def endpoint(scope, receive, send) -> None:
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message) -> None:
+    pass
+
+
+async def per_request_us(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "POST", "path": "/"}, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(args: argparse.Namespace) -> dict:
+    current_query_stats.set(QueryStats())
+    middleware = metrics.MetricsMiddleware(endpoint)
+    # Warm up, including the first lookup of the route's labelled metrics
+    await per_request_us(middleware, 1000)
+
+    baseline = min([await per_request_us(endpoint, args.requests) for _ in range(args.rounds)])
+    with_metrics = min([await per_request_us(middleware, args.requests) for _ in range(args.rounds)])
+    start = time.perf_counter()
+    metrics.flush()
+    flush_us = (time.perf_counter() - start) * 1e6
+    result = {
+        "baseline_us": baseline,
+        "with_metrics_us": with_metrics,
+        "overhead_us": with_metrics - baseline,
+        "flush_us": flush_us,
+    }
+    print(
+        f"baseline {baseline:.2f}us/request, with metrics {with_metrics:.2f}us/request, "
+        f"overhead {result['overhead_us']:.2f}us, flush {flush_us:.0f}us"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of this many runs")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
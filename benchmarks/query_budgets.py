@@ -0,0 +1,189 @@
+"""Query budgets and N+1 detection of the room, material and report listings.
+
+Seeds rooms made by different users, a room full of materials by different
+uploaders and reports by different reporters, so lazy loading a relationship
+row by row shows up as N+1. Then requests every listing once with
+`DB_QUERY_BUDGET_STRICT` on, checking that each route declares a
+`query_budget` and that none exceeds it. Exits non-zero on a failure, so it
+can run in CI against a migrated database. Example:
+
+    python -m benchmarks.query_budgets --rooms 30 --materials 30
+"""
+
+import os
+
+# Before the settings are loaded
+os.environ["DB_QUERY_BUDGET_STRICT"] = "true"
+os.environ["DEBUG"] = "true"
+
+import argparse
+import asyncio
+import json
+import uuid
+from datetime import timedelta
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import delete, insert
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.query_stats import QueryBudgetExceeded
+from app.core.security import create_access_token, get_password_hash
+from app.main import app
+from app.models import StudyMaterial, StudyMaterialReport, StudyRoom, StudyRoomMember, User
+
+
+def seed(args: argparse.Namespace) -> dict:
+    hashed_password = get_password_hash("bench-password")
+    owner = uuid.uuid4()
+    creators = [uuid.uuid4() for _ in range(args.rooms)]
+    uploaders = [uuid.uuid4() for _ in range(args.materials)]
+    reporters = [uuid.uuid4() for _ in range(args.materials)]
+    user_ids = [owner, *creators, *uploaders, *reporters]
+    room_id = uuid.uuid4()
+    room_ids = [uuid.uuid4() for _ in creators]
+    material_ids = [uuid.uuid4() for _ in uploaders]
+
+    with SessionLocal() as session:
+        session.execute(insert(User), [
+            {"id": user_id, "name": f"budget-bench-{i}",
+             "email": f"budget-bench-{user_id}@example.com",
+             "hashed_password": hashed_password}
+            for i, user_id in enumerate(user_ids)
+        ])
+        session.execute(insert(StudyRoom), [
+            {"id": rid, "name": f"budget bench room {i}",
+             "description": "Query budget bench", "max_members": 1000,
+             "created_by": created_by}
+            for i, (rid, created_by) in enumerate(
+                [(room_id, owner), *zip(room_ids, creators)])
+        ])
+        # The owner is in every room, everyone else in the owner's room
+        session.execute(insert(StudyRoomMember), [
+            *({"id": uuid.uuid4(), "study_room_id": rid, "user_id": user_id}
+              for rid, user_id in [(room_id, owner), *zip(room_ids, creators)]),
+            *({"id": uuid.uuid4(), "study_room_id": rid, "user_id": owner}
+              for rid in room_ids),
+            *({"id": uuid.uuid4(), "study_room_id": room_id, "user_id": user_id}
+              for user_id in [*uploaders, *reporters]),
+        ])
+        session.execute(insert(StudyMaterial), [
+            {"id": material_id, "room_id": room_id, "uploaded_by": uploader,
+             "file_name": f"notes-{i}.pdf", "file_url": f"budget-bench/{material_id}.pdf",
+             "status": "ready", "page_count": 1}
+            for i, (material_id, uploader) in enumerate(zip(material_ids, uploaders))
+        ])
+        # One report each, below MATERIAL_HIDE_REPORTERS so they stay listed
+        session.execute(insert(StudyMaterialReport), [
+            {"id": uuid.uuid4(), "material_id": material_id, "reported_by": reporter,
+             "comment": "Query budget bench"}
+            for material_id, reporter in zip(material_ids, reporters)
+        ])
+        session.commit()
+    return {
+        "owner": owner,
+        "user_ids": user_ids,
+        "room_id": room_id,
+        "room_ids": room_ids,
+        "material_id": material_ids[0],
+    }
+
+
+def cleanup(user_ids: list[uuid.UUID]) -> None:
+    # Rooms, memberships, materials and reports go with their users through
+    # ON DELETE CASCADE
+    with SessionLocal() as session:
+        session.execute(delete(User).where(User.id.in_(user_ids)))
+        session.commit()
+
+
+def cases(data: dict) -> list[tuple[str, str, dict]]:
+    """Route name, path and query parameters of each request."""
+    room_id, material_id = data["room_id"], data["material_id"]
+    page = {"limit": 100}
+    return [
+        ("list_study_rooms", "/rooms/", {**page, "filter_by": "joined"}),
+        ("list_study_rooms", "/rooms/", {**page, "search": "budget bench"}),
+        ("list_study_rooms_cursor", "/rooms/cursor", {**page, "filter_by": "joined"}),
+        ("get_study_rooms_batch", "/rooms/batch",
+         {"ids": [str(rid) for rid in data["room_ids"][:50]]}),
+        ("get_study_room", f"/rooms/{room_id}", {}),
+        ("list_room_reports", f"/rooms/{room_id}/reports", page),
+        ("list_room_reports_cursor", f"/rooms/{room_id}/reports/cursor", page),
+        ("list_reported_materials", f"/rooms/{room_id}/reports/materials", page),
+        ("list_study_materials", f"/rooms/{room_id}/materials", page),
+        ("list_study_materials_cursor", f"/rooms/{room_id}/materials/cursor", page),
+        ("list_material_reports", f"/rooms/materials/{material_id}/reports", page),
+        ("list_material_reports_cursor",
+         f"/rooms/materials/{material_id}/reports/cursor", page),
+    ]
+
+
+def has_budget(name: str) -> bool:
+    route = next(
+        route for route in app.routes
+        if isinstance(route, APIRoute) and route.name == name
+    )
+    return any(
+        dependency.call.__qualname__.startswith("query_budget.")
+        for dependency in route.dependant.dependencies
+    )
+
+
+async def run(data: dict) -> list[dict]:
+    token = create_access_token(data["owner"], timedelta(minutes=10))
+    results = []
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        for name, path, params in cases(data):
+            result = {"route": name, "path": path, "params": params, "budget": has_budget(name)}
+            try:
+                response = await client.get(settings.API_V1_STR + path, params=params)
+            except QueryBudgetExceeded as exc:
+                result.update(ok=False, error=str(exc))
+            except Exception as exc:
+                # A lazy load under asyncio fails instead of running a query
+                result.update(ok=False, error=f"{type(exc).__name__}: {str(exc).splitlines()[0]}")
+            else:
+                queries = response.headers.get("x-db-query-count")
+                result.update(
+                    status=response.status_code,
+                    queries=int(queries) if queries else None,
+                    ok=response.status_code == 200,
+                )
+            result["ok"] = result["ok"] and result["budget"]
+            results.append(result)
+    return results
+
+
+def main(args: argparse.Namespace) -> list[dict]:
+    data = seed(args)
+    try:
+        return asyncio.run(run(data))
+    finally:
+        cleanup(data["user_ids"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=30, help="rooms by different creators")
+    parser.add_argument("--materials", type=int, default=30,
+                        help="materials and reports in one room, by different users")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = main(args)
+    for result in results:
+        outcome = "ok" if result["ok"] else "FAIL"
+        detail = result.get("error") or (
+            f"{result['queries']} queries" if result["budget"] else "no query_budget"
+        )
+        print(f"{outcome:<4} {result['route']:<30} {result['path']:<50} {detail}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    if not all(result["ok"] for result in results):
+        raise SystemExit("query budget check failed")
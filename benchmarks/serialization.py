@@ -0,0 +1,166 @@
+"""Serialization time and memory of list pages, FastAPI's default path vs ModelResponse.
+
+Builds pages of in-memory ORM objects (no database needed) for the room,
+material and report listings, then renders each page to JSON bytes both
+ways. Example:
+
+    python -m benchmarks.serialization --sizes 100 1000
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api.responses import ModelResponse
+from app.main import app
+from app.models import StudyMaterial, StudyMaterialReport, StudyRoom, User
+
+NOW = datetime.now(timezone.utc)
+
+
+def _user(i: int) -> User:
+    return User(id=uuid4(), name=f"User {i}", email=f"user{i}@example.com")
+
+
+def _room(i: int) -> StudyRoom:
+    return StudyRoom(
+        id=uuid4(),
+        name=f"Study room {i}",
+        description="Weekly revision sessions for the linear algebra course",
+        max_members=10,
+        member_count=4,
+        created_at=NOW,
+        updated_at=NOW,
+        creator=_user(i),
+    )
+
+
+def _material(i: int) -> StudyMaterial:
+    return StudyMaterial(
+        id=uuid4(),
+        room_id=uuid4(),
+        file_name=f"lecture-{i}.pdf",
+        file_url=f"s3://materials/sha256/ab/cd/{uuid4().hex}.pdf",
+        status="ready",
+        page_count=24,
+        created_at=NOW,
+        uploader=_user(i),
+    )
+
+
+def _report(i: int) -> StudyMaterialReport:
+    return StudyMaterialReport(
+        id=uuid4(),
+        comment="Copyrighted textbook scan",
+        created_at=NOW,
+        material=_material(i),
+        reporter=_user(i),
+    )
+
+
+# Listing endpoint and the objects its pages hold
+CASES = {
+    "rooms": ("list_study_rooms", _room),
+    "materials": ("list_study_materials", _material),
+    "reports": ("list_room_reports", _report),
+}
+
+
+def _route(name: str) -> APIRoute:
+    return next(
+        route for route in app.routes
+        if isinstance(route, APIRoute) and route.name == name
+    )
+
+
+def _run(coro):
+    # serialize_response never actually awaits when given a coroutine endpoint
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("serialize_response suspended")
+
+
+def render_default(route: APIRoute, page) -> bytes:
+    """What FastAPI does with a returned page: validate, dump to dicts, json.dumps."""
+    content = _run(serialize_response(field=route.response_field, response_content=page))
+    return JSONResponse(content).body
+
+
+def render_model(route: APIRoute, page) -> bytes:
+    return ModelResponse(page).body
+
+
+def measure(render, route: APIRoute, page, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(route, page)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        render(route, page)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_ms": statistics.median(timings) * 1000, "peak_kib": peak / 1024}
+
+
+def main(args: argparse.Namespace) -> list[dict]:
+    results = []
+    for case, (route_name, make_item) in CASES.items():
+        route = _route(route_name)
+        for size in args.sizes:
+            page = route.response_model.model_validate(
+                {
+                    "items": [make_item(i) for i in range(size)],
+                    "total": size,
+                    "limit": size,
+                    "offset": 0,
+                }
+            )
+            assert json.loads(render_default(route, page)) == json.loads(
+                render_model(route, page)
+            ), f"{case}: the two paths render different JSON"
+
+            default = measure(render_default, route, page, args.repeat)
+            model = measure(render_model, route, page, args.repeat)
+            result = {
+                "schema": case,
+                "items": size,
+                "default_ms": default["median_ms"],
+                "model_ms": model["median_ms"],
+                "speedup": default["median_ms"] / model["median_ms"],
+                "default_peak_kib": default["peak_kib"],
+                "model_peak_kib": model["peak_kib"],
+            }
+            results.append(result)
+            print(
+                f"{case:<10} items={size:<5} default={result['default_ms']:7.2f}ms "
+                f"model={result['model_ms']:7.2f}ms x{result['speedup']:4.1f} "
+                f"peak {result['default_peak_kib']:8.0f}KiB -> "
+                f"{result['model_peak_kib']:6.0f}KiB"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=50, help="timed renders per page")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,165 @@
+"""Cold start of a fresh worker: import time per module and time to first response.
+
+Imports `app.main` in fresh interpreters under `python -X importtime` and
+reports the slowest modules and the import time per top-level package (own
+time only, so nothing is counted twice), best of `--runs`. Then starts
+Uvicorn, polls `--path` until it answers and times the first
+`/openapi.json` after it, once with the schema built on that request and
+once served from a file written by `python -m app.core.openapi`.
+The default `--path` needs no database. Example:
+
+    python -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from app.core.config import settings
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times() -> tuple[dict[str, int], float]:
+    """Own import time of each module in µs, and the wall time of the import."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    own = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own[match[4]] = int(match[1])
+    return own, wall
+
+
+def import_breakdown(runs: int, top: int) -> dict:
+    best: dict[str, int] = {}
+    walls = []
+    for _ in range(runs):
+        own, wall = import_times()
+        walls.append(wall)
+        for module, us in own.items():
+            best[module] = min(us, best.get(module, us))
+
+    packages: dict[str, int] = defaultdict(int)
+    for module, us in best.items():
+        packages[module.split(".")[0]] += us
+    return {
+        "process_s": min(walls),
+        "import_s": sum(best.values()) / 1e6,
+        "packages_ms": {
+            package: us / 1000
+            for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        "modules_ms": {
+            module: us / 1000
+            for module, us in sorted(best.items(), key=lambda item: -item[1])[:top]
+        },
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(path: str, env: dict, timeout: float) -> dict:
+    """Seconds from starting Uvicorn to the first answer on `path`, then the first schema."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("Uvicorn exited during startup")
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"No response on {path} after {timeout}s")
+                try:
+                    client.get(path)
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter() - start
+            schema_start = time.perf_counter()
+            client.get(f"{settings.API_V1_STR}/openapi.json").raise_for_status()
+            schema = time.perf_counter() - schema_start
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_response_s": ready, "first_openapi_ms": schema * 1000}
+
+
+def startup(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        schema_file = os.path.join(tmp, "openapi.json")
+        subprocess.run([sys.executable, "-m", "app.core.openapi", schema_file], check=True)
+        results = {}
+        for mode, env in (
+            ("built", {**os.environ, "OPENAPI_SCHEMA_FILE": ""}),
+            ("from_file", {**os.environ, "OPENAPI_SCHEMA_FILE": schema_file}),
+        ):
+            runs = [first_response(args.path, env, args.timeout) for _ in range(args.runs)]
+            results[mode] = {
+                "first_response_s": min(run["first_response_s"] for run in runs),
+                "first_openapi_ms": min(run["first_openapi_ms"] for run in runs),
+            }
+    return results
+
+
+def main(args: argparse.Namespace) -> dict:
+    imports = import_breakdown(args.runs, args.top)
+    print(
+        f"import app.main: {imports['import_s']:.3f}s of imports, "
+        f"{imports['process_s']:.3f}s for the whole process"
+    )
+    print("by package:")
+    for package, ms in imports["packages_ms"].items():
+        print(f"  {package:<40} {ms:8.1f}ms")
+    print("slowest modules:")
+    for module, ms in imports["modules_ms"].items():
+        print(f"  {module:<40} {ms:8.1f}ms")
+
+    first = startup(args)
+    for mode, result in first.items():
+        print(
+            f"schema {mode}: first response after {result['first_response_s']:.3f}s, "
+            f"first openapi.json {result['first_openapi_ms']:.1f}ms"
+        )
+    return {"imports": imports, "startup": first}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="best of this many cold starts")
+    parser.add_argument("--top", type=int, default=15, help="packages and modules listed")
+    parser.add_argument("--path", default="/metrics", help="polled until it answers")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = main(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,28 @@
+"""Gunicorn settings for running the API with several Uvicorn workers.
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/studyroom-metrics gunicorn app.main:app
+
+`/metrics` then aggregates the samples of all workers, see `app/core/metrics.py`.
+"""
+
+import os
+import shutil
+
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be added to this one's
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
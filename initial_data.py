@@ -1,16 +1,404 @@
+"""Create the first superuser and, optionally, a generated dataset.
+
+Without options only the superuser from `FIRST_SUPERUSER_EMAIL` is created.
+With `--users` the database from `.env` (migrations applied) also gets
+users, rooms with power-law distributed member counts, memberships,
+materials and reports, streamed in with PostgreSQL `COPY`. The same
+`--seed` always produces the same rows, ids and timestamps, so query plans
+and benchmarks can be compared across runs. Example:
+
+    python initial_data.py --users 1000000 --rooms 100000 \\
+        --materials 500000 --reports 50000 --pdfs 50 --seed 1
+
+Every generated user logs in with the password `SEED_PASSWORD`. Ids depend
+only on the seed, so load a seed into a given database once; use another
+`--seed` to add more rows.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
 import logging
-from app.core.db import SessionLocal, init_db
+import random
+import time
+import uuid
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core import storage
+from app.core.db import SessionLocal, engine, init_db
+from app.core.security import get_password_hash
+from app.models import MaterialBlob
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEED_PASSWORD = "seed-password"
+TOPICS = [
+    "algebra", "biology", "calculus", "chemistry", "economics",
+    "history", "literature", "physics", "programming", "statistics",
+]
+REPORT_COMMENTS = [
+    "Copyrighted textbook scan", "Wrong course", "Spam", "Offensive content",
+    "Duplicate upload", "Unreadable file",
+]
+# Timestamps fall in the year before this date rather than before now, so
+# a seed generates the same rows whenever it runs
+SEED_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+SEED_PERIOD_SECONDS = 365 * 24 * 3600
+# Rows buffered in memory per COPY statement
+COPY_BATCH_ROWS = 50_000
+# Reports pick a material with `random() ** REPORT_SKEW`, so a small share of
+# the materials gets most reports and some reach `MATERIAL_HIDE_REPORTERS`
+REPORT_SKEW = 4
+# Per-row counter triggers would update a room or material for every row
+# copied; they are off during the load and the counters are set directly
+# or recounted once at the end
+COUNTER_TRIGGERS = {
+    "study_room_members": "study_room_members_count",
+    "study_materials": "material_blob_refs",
+    "study_material_reports": "study_material_reports_count",
+}
+NULL = r"\N"
+
+
+def placeholder_pdf(pages: list[list[str]]) -> bytes:
+    """A small valid PDF with one page per item of `pages`, each a list of text lines."""
+    objects = [b"<</Type/Catalog/Pages 2 0 R>>", b""]
+    kids = []
+    for lines in pages:
+        stream = b"BT /F1 12 Tf 72 720 Td 14 TL " + b" ".join(
+            b"(%s) '" % line.encode() for line in lines
+        ) + b" ET"
+        kids.append(b"%d 0 R" % (len(objects) + 1))
+        objects.append(
+            b"<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]"
+            b"/Resources<</Font<</F1<</Type/Font/Subtype/Type1/BaseFont/Helvetica>>>>>>"
+            b"/Contents %d 0 R>>" % (len(objects) + 2)
+        )
+        objects.append(b"<</Length %d>>stream\n%s\nendstream" % (len(stream), stream))
+    objects[1] = b"<</Type/Pages/Kids[%s]/Count %d>>" % (b" ".join(kids), len(pages))
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref,
+    )
+    return bytes(pdf)
+
+
+def seed_uuid(seed: int, kind: str, index: int) -> str:
+    """Random-looking but stable id of the `index`-th generated `kind` row."""
+    digest = hashlib.blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=16).digest()
+    return str(uuid.UUID(bytes=digest, version=4))
+
+
+def _timestamp(rng: random.Random) -> str:
+    return (SEED_EPOCH - timedelta(seconds=rng.randrange(SEED_PERIOD_SECONDS))).isoformat()
+
+
+def copy_rows(cursor, table: str, columns: list[str], rows: Iterable[tuple]) -> int:
+    """Stream `rows` into `table` with `COPY`, `COPY_BATCH_ROWS` at a time.
+
+    Values are written as-is in COPY's text format, so they must not contain
+    tabs, newlines or backslashes; `NULL` stands for SQL NULL.
+    """
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    start = time.perf_counter()
+    count = 0
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(row))
+        buffer.write("\n")
+        count += 1
+        if count % COPY_BATCH_ROWS == 0:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            buffer = io.StringIO()
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+    logger.info("%s: %d rows in %.1fs", table, count, time.perf_counter() - start)
+    return count
+
+
+class DatasetGenerator:
+    """Rows of one seeded dataset, generated in dependency order.
+
+    Users and materials are referred to by index and their ids derived
+    with `seed_uuid`, so only the memberships are kept in memory: the
+    members of room `r` are `member_users[member_offsets[r]:member_offsets[r + 1]]`,
+    with the owner first.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.member_offsets = array("q", [0])
+        self.member_users = array("q")
+        # Room of each generated material, to pick its reporters from
+        self.material_rooms = array("q")
+        # (sha256, page_count) of the placeholder files materials point at
+        self.blobs: list[tuple[str, int]] = []
+
+    def _id(self, kind: str, index: int) -> str:
+        return seed_uuid(self.args.seed, kind, index)
+
+    def plan_rooms(self) -> None:
+        """Draw each room's size and members.
+
+        Sizes follow a Pareto distribution: most rooms have a handful of
+        members and a few have thousands, up to `--max-room-size`.
+        """
+        args, rng = self.args, self.rng
+        cap = min(args.max_room_size, args.users)
+        for _ in range(args.rooms):
+            size = min(cap, int(rng.paretovariate(args.room_size_alpha)))
+            owner = rng.randrange(args.users)
+            others = [user for user in rng.sample(range(args.users), size) if user != owner]
+            self.member_users.append(owner)
+            self.member_users.extend(others[: size - 1])
+            self.member_offsets.append(len(self.member_users))
+
+    def users(self) -> Iterator[tuple]:
+        hashed_password = get_password_hash(SEED_PASSWORD)
+        for i in range(self.args.users):
+            created_at = _timestamp(self.rng)
+            yield (
+                self._id("user", i), f"User {i}",
+                f"user{i}.seed{self.args.seed}@example.com", hashed_password,
+                created_at, "t", "f", created_at,
+            )
+
+    def rooms(self) -> Iterator[tuple]:
+        rng = self.rng
+        for r in range(self.args.rooms):
+            start, end = self.member_offsets[r], self.member_offsets[r + 1]
+            topic = rng.choice(TOPICS)
+            created_at = _timestamp(rng)
+            yield (
+                self._id("room", r), f"{topic.capitalize()} study group {r}",
+                f"Weekly {topic} revision sessions", created_at, created_at,
+                str(max(end - start, rng.choice((10, 25, 50, 100)))),
+                self._id("user", self.member_users[start]), str(end - start),
+            )
+
+    def memberships(self) -> Iterator[tuple]:
+        for r in range(self.args.rooms):
+            room_id = self._id("room", r)
+            for j in range(self.member_offsets[r], self.member_offsets[r + 1]):
+                yield (
+                    self._id("member", j), room_id,
+                    self._id("user", self.member_users[j]), _timestamp(self.rng),
+                )
+
+    def materials(self) -> Iterator[tuple]:
+        # Uploaded by a random membership, so larger rooms get more materials
+        rng = self.rng
+        for m in range(self.args.materials):
+            j = rng.randrange(len(self.member_users))
+            room = bisect_right(self.member_offsets, j) - 1
+            self.material_rooms.append(room)
+            material_id = self._id("material", m)
+            if self.blobs:
+                sha256, page_count = rng.choice(self.blobs)
+                file_url = storage.backend.url(storage.blob_key(sha256))
+            else:
+                # Like materials whose file went missing before blobs existed,
+                # downloading these answers 404
+                sha256, page_count = NULL, rng.randint(1, 40)
+                file_url = storage.backend.url(f"seed/{material_id}.pdf")
+            created_at = _timestamp(rng)
+            yield (
+                material_id, self._id("room", room), self._id("user", self.member_users[j]),
+                f"{rng.choice(TOPICS)}-notes-{m}.pdf", file_url, created_at, created_at,
+                sha256, "ready", str(page_count),
+            )
+
+    def reports(self) -> Iterator[tuple]:
+        rng = self.rng
+        for k in range(self.args.reports):
+            m = int(self.args.materials * rng.random() ** REPORT_SKEW)
+            room = self.material_rooms[m]
+            start, end = self.member_offsets[room], self.member_offsets[room + 1]
+            yield (
+                self._id("report", k), self._id("material", m),
+                self._id("user", self.member_users[rng.randrange(start, end)]),
+                rng.choice(REPORT_COMMENTS), _timestamp(rng),
+            )
+
+    async def store_pdfs(self) -> None:
+        """Store `--pdfs` distinct placeholder files and index their text."""
+        rng = self.rng
+        rows = []
+        for i in range(self.args.pdfs):
+            topic = rng.choice(TOPICS)
+            pages = [
+                [f"{topic.capitalize()} lecture {i}, page {page}"]
+                + [" ".join(rng.choices(TOPICS, k=8)) for _ in range(10)]
+                for page in range(1, rng.randint(1, 12) + 1)
+            ]
+
+            async def chunks(content=placeholder_pdf(pages)):
+                yield content
+
+            temp_path, sha256, size = await storage.receive_stream(chunks())
+            await storage.backend.save(storage.blob_key(sha256), temp_path)
+            self.blobs.append((sha256, len(pages)))
+            rows.append({
+                "sha256": sha256, "size": size,
+                "content_text": "\n".join(line for lines in pages for line in lines),
+            })
+
+        # Indexed here like the worker would, so search works without it
+        with SessionLocal() as session:
+            session.execute(
+                pg_insert(MaterialBlob)
+                .values([
+                    {
+                        **row,
+                        "search_vector": func.to_tsvector("english", row["content_text"]),
+                        "indexed_at": func.now(),
+                    }
+                    for row in rows
+                ])
+                .on_conflict_do_nothing()
+            )
+            session.commit()
+        logger.info("material_blobs: %d placeholder files stored", len(rows))
+
+
+def _recount(cursor) -> None:
+    """Set the trigger-maintained counters the bulk load didn't keep up to date."""
+    cursor.execute("""
+        UPDATE material_blobs b SET ref_count = m.ref_count
+        FROM (
+            SELECT blob_sha256, count(*) AS ref_count
+            FROM study_materials WHERE blob_sha256 IS NOT NULL
+            GROUP BY blob_sha256
+        ) m
+        WHERE m.blob_sha256 = b.sha256 AND b.ref_count <> m.ref_count
+    """)
+    cursor.execute("""
+        UPDATE study_materials m
+        SET report_count = r.report_count, reporter_count = r.reporter_count
+        FROM (
+            SELECT material_id, count(*) AS report_count,
+                   count(DISTINCT reported_by) AS reporter_count
+            FROM study_material_reports
+            GROUP BY material_id
+        ) r
+        WHERE r.material_id = m.id
+          AND (m.report_count, m.reporter_count)
+              IS DISTINCT FROM (r.report_count, r.reporter_count)
+    """)
+
+
+def generate(args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    generator = DatasetGenerator(args)
+    generator.plan_rooms()
+    if args.pdfs:
+        asyncio.run(generator.store_pdfs())
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            # The ALTERs commit with the load, so other sessions never see
+            # the triggers disabled; they wait on the table locks instead
+            for table, trigger in COUNTER_TRIGGERS.items():
+                cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER {trigger}")
+            copy_rows(cursor, "users", [
+                "id", "name", "email", "hashed_password", "created_at",
+                "is_active", "is_superuser", "last_login",
+            ], generator.users())
+            copy_rows(cursor, "study_rooms", [
+                "id", "name", "description", "created_at", "updated_at",
+                "max_members", "created_by", "member_count",
+            ], generator.rooms())
+            copy_rows(cursor, "study_room_members", [
+                "id", "study_room_id", "user_id", "joined_at",
+            ], generator.memberships())
+            copy_rows(cursor, "study_materials", [
+                "id", "room_id", "uploaded_by", "file_name", "file_url",
+                "created_at", "updated_at", "blob_sha256", "status", "page_count",
+            ], generator.materials())
+            copy_rows(cursor, "study_material_reports", [
+                "id", "material_id", "reported_by", "comment", "created_at",
+            ], generator.reports())
+            _recount(cursor)
+            for table, trigger in COUNTER_TRIGGERS.items():
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER {trigger}")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    # Fresh statistics and visibility maps, so the first queries already get
+    # the plans (and index-only scans) they would get in production
+    vacuum_start = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            "VACUUM (ANALYZE) users, study_rooms, study_room_members, "
+            "study_materials, study_material_reports, material_blobs"
+        ))
+    logger.info("vacuum analyze in %.1fs", time.perf_counter() - vacuum_start)
+    logger.info("Generated dataset with seed %d in %.1fs", args.seed, time.perf_counter() - start)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=0, help="generated users, 0 for none")
+    parser.add_argument("--rooms", type=int, default=0)
+    parser.add_argument("--materials", type=int, default=0)
+    parser.add_argument("--reports", type=int, default=0)
+    parser.add_argument(
+        "--pdfs", type=int, default=0,
+        help="distinct placeholder PDFs stored and shared by the materials; "
+             "with 0, materials have no file",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--room-size-alpha", type=float, default=1.2,
+        help="Pareto shape of room sizes, lower gives more large rooms",
+    )
+    parser.add_argument("--max-room-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.rooms and not args.users:
+        parser.error("--rooms needs --users")
+    if args.materials and not args.rooms:
+        parser.error("--materials needs --rooms")
+    if args.reports and not args.materials:
+        parser.error("--reports needs --materials")
+    if args.room_size_alpha <= 0 or args.max_room_size < 1:
+        parser.error("--room-size-alpha and --max-room-size must be positive")
+    return args
+
 
 def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
     logger.info("Creating initial data")
     with SessionLocal() as session:
         init_db(session)
+    if args.users:
+        generate(args)
     logger.info("Initial data created")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
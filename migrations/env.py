@@ -80,6 +80,11 @@ def run_migrations_online() -> None:
         with context.begin_transaction():
             context.run_migrations()
 
+    # File changes that must only happen once the schema change is committed,
+    # registered by migrations with `after_commit` in `config.attributes`
+    for hook in config.attributes.pop("after_commit", []):
+        hook()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,88 @@
+"""Add material report counts
+
+Revision ID: 051a0886433b
+Revises: 2c517ffe5e22
+Create Date: 2026-10-18 16:47:09.715581
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '051a0886433b'
+down_revision: Union[str, Sequence[str], None] = '2c517ffe5e22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('study_materials', sa.Column('report_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('study_materials', sa.Column('reporter_count', sa.Integer(), server_default='0', nullable=False))
+    # Block new reports until the trigger and backfill are in place
+    op.execute("LOCK TABLE study_material_reports IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("""
+        CREATE FUNCTION study_material_report_count() RETURNS trigger AS $$
+        BEGIN
+            -- The first UPDATE locks the material, so concurrent reports by
+            -- the same user are committed before the NOT EXISTS check runs
+            IF TG_OP = 'INSERT' THEN
+                UPDATE study_materials
+                SET report_count = report_count + 1, updated_at = now()
+                WHERE id = NEW.material_id;
+                IF NOT EXISTS (
+                    SELECT 1 FROM study_material_reports
+                    WHERE material_id = NEW.material_id
+                      AND reported_by = NEW.reported_by AND id <> NEW.id
+                ) THEN
+                    UPDATE study_materials
+                    SET reporter_count = reporter_count + 1
+                    WHERE id = NEW.material_id;
+                END IF;
+            ELSE
+                UPDATE study_materials
+                SET report_count = report_count - 1, updated_at = now()
+                WHERE id = OLD.material_id;
+                IF NOT EXISTS (
+                    SELECT 1 FROM study_material_reports
+                    WHERE material_id = OLD.material_id
+                      AND reported_by = OLD.reported_by
+                ) THEN
+                    UPDATE study_materials
+                    SET reporter_count = reporter_count - 1
+                    WHERE id = OLD.material_id;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER study_material_reports_count
+        AFTER INSERT OR DELETE ON study_material_reports
+        FOR EACH ROW EXECUTE FUNCTION study_material_report_count()
+    """)
+    op.execute("""
+        UPDATE study_materials m
+        SET report_count = r.report_count, reporter_count = r.reporter_count
+        FROM (
+            SELECT material_id, count(*) AS report_count,
+                   count(DISTINCT reported_by) AS reporter_count
+            FROM study_material_reports
+            GROUP BY material_id
+        ) r
+        WHERE r.material_id = m.id
+    """)
+    op.create_index('ix_study_materials_room_id_report_count', 'study_materials', ['room_id', 'report_count', 'created_at', 'id'], unique=False, postgresql_where=sa.text('report_count > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER study_material_reports_count ON study_material_reports")
+    op.execute("DROP FUNCTION study_material_report_count()")
+    op.drop_index('ix_study_materials_room_id_report_count', table_name='study_materials', postgresql_where=sa.text('report_count > 0'))
+    op.drop_column('study_materials', 'reporter_count')
+    op.drop_column('study_materials', 'report_count')
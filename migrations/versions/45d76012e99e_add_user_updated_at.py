@@ -0,0 +1,29 @@
+"""Add user updated_at
+
+Revision ID: 45d76012e99e
+Revises: 051a0886433b
+Create Date: 2026-10-18 18:31:51.036061
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45d76012e99e'
+down_revision: Union[str, Sequence[str], None] = '051a0886433b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.execute("UPDATE users SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,51 @@
+"""Add study room search indexes
+
+Revision ID: 4e402de647e3
+Revises: 7a14f44cb12f
+Create Date: 2026-10-18 16:12:05.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e402de647e3'
+down_revision: Union[str, Sequence[str], None] = '7a14f44cb12f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'study_rooms',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_DOCUMENT, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index('ix_study_rooms_search_vector', 'study_rooms', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_study_rooms_name_trgm', 'study_rooms', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_study_rooms_description_trgm', 'study_rooms', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_study_rooms_description_trgm', table_name='study_rooms', postgresql_using='gin')
+    op.drop_index('ix_study_rooms_name_trgm', table_name='study_rooms', postgresql_using='gin')
+    op.drop_index('ix_study_rooms_search_vector', table_name='study_rooms', postgresql_using='gin')
+    op.drop_column('study_rooms', 'search_vector')
+    # pg_trgm is left installed, other objects may depend on it
@@ -0,0 +1,63 @@
+"""Add study room member count
+
+Revision ID: 5d87ffd43e1e
+Revises: f01fbc16ab7b
+Create Date: 2026-10-18 16:20:31.891106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d87ffd43e1e'
+down_revision: Union[str, Sequence[str], None] = 'f01fbc16ab7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'study_rooms',
+        sa.Column('member_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    # Block membership changes until the trigger and backfill are in place
+    op.execute("LOCK TABLE study_room_members IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("""
+        CREATE FUNCTION study_room_member_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE study_rooms
+                SET member_count = member_count + 1, updated_at = now()
+                WHERE id = NEW.study_room_id;
+            ELSE
+                UPDATE study_rooms
+                SET member_count = member_count - 1, updated_at = now()
+                WHERE id = OLD.study_room_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER study_room_members_count
+        AFTER INSERT OR DELETE ON study_room_members
+        FOR EACH ROW EXECUTE FUNCTION study_room_member_count()
+    """)
+    op.execute("""
+        UPDATE study_rooms r
+        SET member_count = (
+            SELECT count(*) FROM study_room_members m
+            WHERE m.study_room_id = r.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER study_room_members_count ON study_room_members")
+    op.execute("DROP FUNCTION study_room_member_count()")
+    op.drop_column('study_rooms', 'member_count')
@@ -0,0 +1,175 @@
+"""Add material blobs
+
+Revision ID: c57f088b296e
+Revises: 5d87ffd43e1e
+Create Date: 2026-10-18 16:26:29.092605
+
+"""
+import hashlib
+import os
+import shutil
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c57f088b296e'
+down_revision: Union[str, Sequence[str], None] = '5d87ffd43e1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _blob_path(sha256: str) -> str:
+    # same layout as app.core.storage.blob_path at the time of this revision
+    return os.path.join(
+        settings.MATERIAL_UPLOAD_DIR, "sha256", sha256[:2], sha256[2:4], f"{sha256}.pdf"
+    )
+
+
+def _copy_file(source: str, path: str) -> None:
+    # Written under a temporary name, so a file at `path` is always complete
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _after_commit(hook) -> None:
+    # Run by migrations/env.py once the migration's transaction is committed
+    op.get_context().config.attributes.setdefault("after_commit", []).append(hook)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'material_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('study_materials', sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_study_materials_blob_sha256'), 'study_materials', ['blob_sha256'], unique=False)
+    op.create_foreign_key(
+        'study_materials_blob_sha256_fkey', 'study_materials', 'material_blobs',
+        ['blob_sha256'], ['sha256'],
+    )
+    op.execute("""
+        CREATE FUNCTION material_blob_ref_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE material_blobs SET ref_count = ref_count + 1
+                WHERE sha256 = NEW.blob_sha256;
+            ELSE
+                UPDATE material_blobs SET ref_count = ref_count - 1
+                WHERE sha256 = OLD.blob_sha256;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER material_blob_refs
+        AFTER INSERT OR DELETE ON study_materials
+        FOR EACH ROW EXECUTE FUNCTION material_blob_ref_count()
+    """)
+
+    # Copy existing uploads into the content-addressed layout. Materials whose
+    # file is missing keep their old file_url and no blob. The originals are
+    # only deleted once this is committed: if the migration fails, file_url
+    # still points at them, and the copies are unreferenced blobs.
+    op.execute("LOCK TABLE study_materials IN SHARE ROW EXCLUSIVE MODE")
+    conn = op.get_bind()
+    materials = conn.execute(
+        sa.text("SELECT id, file_url FROM study_materials WHERE blob_sha256 IS NULL")
+    ).all()
+    originals = []
+    for material_id, file_url in materials:
+        if not os.path.isfile(file_url):
+            continue
+        sha256 = _hash_file(file_url)
+        path = _blob_path(sha256)
+        if not os.path.exists(path):
+            _copy_file(file_url, path)
+        originals.append(file_url)
+        conn.execute(
+            sa.text("""
+                INSERT INTO material_blobs (sha256, size) VALUES (:sha256, :size)
+                ON CONFLICT (sha256) DO NOTHING
+            """),
+            {"sha256": sha256, "size": os.path.getsize(path)},
+        )
+        conn.execute(
+            sa.text("""
+                UPDATE study_materials SET blob_sha256 = :sha256, file_url = :path
+                WHERE id = :id
+            """),
+            {"sha256": sha256, "path": path, "id": material_id},
+        )
+    op.execute("""
+        UPDATE material_blobs b
+        SET ref_count = (
+            SELECT count(*) FROM study_materials m
+            WHERE m.blob_sha256 = b.sha256
+        )
+    """)
+
+    def remove_originals() -> None:
+        for file_url in originals:
+            if os.path.exists(file_url):
+                os.remove(file_url)
+
+    _after_commit(remove_originals)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Give every material its own copy again, as <room_id>/<material_id>.pdf.
+    # The blob store is only removed once this is committed, and only if
+    # every material's copy is in place.
+    conn = op.get_bind()
+    materials = conn.execute(
+        sa.text("""
+            SELECT id, room_id, blob_sha256 FROM study_materials
+            WHERE blob_sha256 IS NOT NULL
+        """)
+    ).all()
+    for material_id, room_id, sha256 in materials:
+        blob = _blob_path(sha256)
+        path = os.path.join(settings.MATERIAL_UPLOAD_DIR, str(room_id), f"{material_id}.pdf")
+        if not os.path.isfile(blob):
+            raise RuntimeError(f"Blob {blob} of material {material_id} is missing")
+        _copy_file(blob, path)
+        if os.path.getsize(path) != os.path.getsize(blob):
+            raise RuntimeError(f"Copy {path} of blob {blob} is incomplete")
+        conn.execute(
+            sa.text("UPDATE study_materials SET file_url = :path WHERE id = :id"),
+            {"path": path, "id": material_id},
+        )
+
+    def remove_blobs() -> None:
+        blob_dir = os.path.join(settings.MATERIAL_UPLOAD_DIR, "sha256")
+        if os.path.isdir(blob_dir):
+            shutil.rmtree(blob_dir)
+
+    _after_commit(remove_blobs)
+
+    op.execute("DROP TRIGGER material_blob_refs ON study_materials")
+    op.execute("DROP FUNCTION material_blob_ref_count()")
+    op.drop_constraint('study_materials_blob_sha256_fkey', 'study_materials', type_='foreignkey')
+    op.drop_index(op.f('ix_study_materials_blob_sha256'), table_name='study_materials')
+    op.drop_column('study_materials', 'blob_sha256')
+    op.drop_table('material_blobs')